@@ -1,5 +1,16 @@
+import time
+
 import streamlit as st
-from PIL import Image
+
+started = time.perf_counter()
+
+from engine.startup import PageProfile, preload_modules
+
+profile = PageProfile("Home", started)
+
+from engine import preload_detector
+
+profile.imported()
 
 st.set_page_config(
     page_title="PV Module Defect Detection",
@@ -7,6 +18,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+preload_detector()
+
 st.markdown("""
     <style>
     .main {
@@ -187,3 +200,6 @@ st.markdown("""
         <p>Powered by YOLOv8 Deep Learning Technology</p>
     </div>
 """, unsafe_allow_html=True)
+
+profile.rendered()
+preload_modules()
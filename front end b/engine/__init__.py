@@ -0,0 +1,13 @@
+from .detector import (
+    CLASS_NAMES,
+    SEVERITIES,
+    ClassicalDetector,
+    Detections,
+    Detector,
+    OnnxDetector,
+    get_detector,
+    load_detector,
+    preload_detector,
+)
+from .pipeline import STAGES, detect_candidates, finalize
+from .postprocess import DEFAULT_CONFIDENCE, class_ids_for, merge_fragments, nms, postprocess
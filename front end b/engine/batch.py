@@ -0,0 +1,250 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+
+from .detector import (
+    CLASS_NAMES, FALLBACK_TAG, MODEL_PATH, PRECISION, PRECISIONS, available_precisions, get_detector, source_label,
+)
+from .ingest import decode_image, image_size
+from .pipeline import detect_candidates, finalize
+from .postprocess import class_ids_for
+from .store import get_store
+from .tiling import TILE_OVERLAP, TILE_SIZE, detect_tiled, tile_seams
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+REPORT_SECONDS = 5.0
+
+_settings = None
+
+
+def find_images(inputs, recursive=True):
+    """Image files under ``inputs`` (files or directories), as sorted absolute paths."""
+    found = set()
+    for item in inputs:
+        if os.path.isfile(item):
+            found.add(os.path.abspath(item))
+            continue
+        for root, dirs, files in os.walk(item):
+            found.update(os.path.abspath(os.path.join(root, f)) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+            if not recursive:
+                dirs.clear()
+    return sorted(found)
+
+
+def analyze_file(path, detector, confidence, class_ids, tiled=None, tile_size=TILE_SIZE, tile_overlap=TILE_OVERLAP):
+    """Same pipeline as the Detection page: reduced decode for whole-image inference, full decode for tiles.
+
+    ``tiled=None`` tiles images more than twice ``tile_size`` on their long
+    side, matching the page's default. Returns the finalized detections,
+    their records and the source size.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    size = image_size(data)[0]
+    if tiled is None:
+        tiled = max(size) > 2 * tile_size
+    if tiled:
+        pixels, _ = decode_image(data)
+        candidates, _ = detect_tiled(pixels, detector, tile_size, tile_overlap)
+    else:
+        pixels, decode = decode_image(data, min_side=detector.input_size)
+        candidates = detect_candidates(pixels, detector).scaled(1 / decode.scale)
+    seams = tile_seams(*size, tile_size, tile_overlap) if tiled else None
+    dets, records = finalize(candidates, confidence, class_ids, merge=tiled, seams=seams)
+    return dets, records, size
+
+
+def _init_worker(settings):
+    """Pool initializer: load and warm this worker's own detector once, with a share of the cores."""
+    global _settings
+    _settings = settings
+    cv2.setNumThreads(settings["threads"])
+    get_detector(settings["precision"])
+
+
+def _process(path):
+    start = time.perf_counter()
+    detector = get_detector(_settings["precision"])
+    try:
+        dets, records, size = analyze_file(
+            path, detector, _settings["confidence"], _settings["class_ids"], _settings["tiled"],
+            _settings["tile_size"], _settings["tile_overlap"],
+        )
+    except Exception as exc:
+        return {"path": path, "error": f"{type(exc).__name__}: {exc}"}, None
+    return {
+        "path": path,
+        "panel_id": os.path.splitext(os.path.basename(path))[0],
+        "width": size[0],
+        "height": size[1],
+        "fallback": detector.fallback,
+        "detections": records,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }, dets
+
+
+class JsonlSink:
+    """Appends one JSON line per image; lines without an ``error`` mark images as done for ``--resume``."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def done(self):
+        if not os.path.exists(self.path):
+            return set()
+        done = set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interrupted run
+                if "error" not in result:
+                    done.add(result["path"])
+        return done
+
+    def __enter__(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def write(self, result, dets):
+        self._file.write(json.dumps(result) + "\n")
+        self._file.flush()
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+class StoreSink:
+    """Records each image as an inspection in the detection store, so results show up on the Dashboard."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def done(self):
+        sources = self.store.recorded_sources(media="image")
+        return {source.removesuffix(FALLBACK_TAG) for source in sources if source is not None}
+
+    def __enter__(self):
+        return self
+
+    def write(self, result, dets):
+        if dets is not None:
+            self.store.record_inspection(
+                result["panel_id"], dets, source=source_label(result["path"], result["fallback"]), media="image"
+            )
+
+    def __exit__(self, *exc):
+        pass
+
+
+def run(paths, sink, workers, settings, resume=True, log=sys.stderr):
+    """Fan ``paths`` out over ``workers`` processes and stream results into ``sink``; returns a summary dict."""
+    total = len(paths)
+    if resume:
+        done = sink.done()
+        paths = [p for p in paths if p not in done]
+    skipped = total - len(paths)
+    processed = failed = defects = 0
+    start = last_report = time.perf_counter()
+    if skipped:
+        print(f"Skipping {skipped} already analyzed image(s)", file=log)
+    if not paths:
+        return {"images": 0, "skipped": skipped, "failed": 0, "defects": 0, "elapsed_s": 0.0, "images_per_s": 0.0}
+    # spawn, not fork: OpenCV's thread pool does not survive a fork.
+    context = multiprocessing.get_context("spawn")
+    workers = max(1, min(workers, len(paths)))
+    with sink, context.Pool(workers, initializer=_init_worker, initargs=(settings,)) as pool:
+        for result, dets in pool.imap_unordered(_process, paths, chunksize=4):
+            sink.write(result, dets)
+            processed += 1
+            if "error" in result:
+                failed += 1
+                print(f"{result['path']}: {result['error']}", file=log)
+            else:
+                defects += len(result["detections"])
+            now = time.perf_counter()
+            if now - last_report >= REPORT_SECONDS:
+                rate = processed / (now - start)
+                eta = (len(paths) - processed) / rate if rate else 0.0
+                print(f"{processed}/{len(paths)} images · {rate:.1f} images/s · ETA {eta:.0f}s", file=log)
+                last_report = now
+    elapsed = time.perf_counter() - start
+    summary = {
+        "images": processed,
+        "skipped": skipped,
+        "failed": failed,
+        "defects": defects,
+        "elapsed_s": round(elapsed, 2),
+        "images_per_s": round(processed / elapsed, 2) if elapsed else 0.0,
+    }
+    print(
+        f"Analyzed {processed} image(s) in {elapsed:.1f}s ({summary['images_per_s']} images/s), "
+        f"{failed} failed, {skipped} skipped, {defects} defects",
+        file=log,
+    )
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.batch",
+        description="Analyze directories of inspection images with the Detection page's pipeline.",
+    )
+    parser.add_argument("inputs", nargs="+", help="Image files or directories to analyze")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--jsonl", metavar="PATH", help="Append one JSON line of detections per image")
+    output.add_argument("--store", action="store_true", help="Record results in the detection store (PV_STORE_PATH)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: all cores)")
+    parser.add_argument(
+        "--threads", type=int, default=None,
+        help="OpenCV threads per worker (default: cores divided by workers)",
+    )
+    parser.add_argument("--confidence", type=float, default=0.5, help="Minimum confidence (default: 0.5)")
+    parser.add_argument(
+        "--precision", choices=PRECISIONS, default=PRECISION,
+        help=f"Model precision; int8 quantizes the model when each worker loads it (default: {PRECISION})",
+    )
+    parser.add_argument(
+        "--types", nargs="+", choices=CLASS_NAMES, default=CLASS_NAMES, metavar="TYPE",
+        help="Defect types to keep (default: all)",
+    )
+    tiling = parser.add_mutually_exclusive_group()
+    tiling.add_argument("--tiled", dest="tiled", action="store_true", default=None, help="Always use tiled inference")
+    tiling.add_argument("--no-tiled", dest="tiled", action="store_false", help="Never use tiled inference")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--tile-overlap", type=float, default=TILE_OVERLAP)
+    parser.add_argument("--no-recursive", dest="recursive", action="store_false", help="Only top-level files")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="Reanalyze images already done")
+    args = parser.parse_args(argv)
+
+    if args.precision not in available_precisions():
+        parser.error(f"--precision {args.precision} needs an ONNX model at {MODEL_PATH}")
+    paths = find_images(args.inputs, args.recursive)
+    if not paths:
+        parser.error("no images found")
+    workers = max(1, min(args.workers, len(paths)))
+    settings = {
+        "confidence": args.confidence,
+        "class_ids": class_ids_for(args.types),
+        "tiled": args.tiled,
+        "tile_size": args.tile_size,
+        "tile_overlap": args.tile_overlap,
+        "threads": args.threads or max(1, (os.cpu_count() or 1) // workers),
+        "precision": args.precision,
+    }
+    if args.store:
+        sink = StoreSink(get_store())
+    else:
+        sink = JsonlSink(args.jsonl)
+    summary = run(paths, sink, workers, settings, resume=args.resume)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
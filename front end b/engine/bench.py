@@ -0,0 +1,370 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import plotly.graph_objects as go
+
+from .dashboard import history_frame, load_datasets, load_trend, query_cache
+from .detector import CLASS_NAMES, CLASS_SEVERITY, INPUT_SIZE, MODEL_PATH, Detections, OnnxDetector
+from .ingest import decode_image
+from .pipeline import detect_candidates, finalize
+from .postprocess import postprocess
+from .render import render_full, render_preview
+from .store import DetectionStore, HistoryFilter
+from .tracking import Tracker
+from .video import analyze_video
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "12MP": (4000, 3000), "24MP": (6000, 4000)}
+STORE_SIZES = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+SEED = 0
+
+
+class StubDetector(OnnxDetector):
+    """YOLOv8-shaped detector with no network: real letterbox/blob preprocessing and decode, synthetic raw output.
+
+    Each image gets a handful of defects, each surrounded by a cloud of
+    jittered overlapping candidates as a real head produces, over a floor of
+    low-score background anchors, so NMS sees a realistic load. Output
+    depends only on the batch position, so runs are comparable.
+    """
+
+    name = "stub"
+    version = "stub-1"
+
+    def __init__(self, input_size=INPUT_SIZE, candidate_threshold=0.05, anchors=8400, defects=6):
+        self.input_size = input_size
+        self.candidate_threshold = candidate_threshold
+        self.anchors = anchors
+        self.defects = defects
+
+    def infer(self, batch):
+        return np.stack([self._raw(i, self._content(blob)) for i, blob in enumerate(batch)])
+
+    def _content(self, blob):
+        """Width and height of the letterboxed image inside the padded input, so boxes land on the picture."""
+        padding = np.abs(blob[0] - 114 / 255) < 1e-3
+        rows, cols = np.flatnonzero(~padding.all(axis=1)), np.flatnonzero(~padding.all(axis=0))
+        size = self.input_size
+        return np.array([cols[-1] + 1 if len(cols) else size, rows[-1] + 1 if len(rows) else size])
+
+    def _raw(self, seed, content):
+        rng = np.random.default_rng(SEED + seed)
+        size = self.input_size
+        raw = np.empty((4 + len(CLASS_NAMES), self.anchors), dtype=np.float32)
+        raw[:2] = rng.uniform(0, 1, (2, self.anchors)) * content[:, None]
+        raw[2:4] = rng.uniform(8, size / 8, (2, self.anchors))
+        raw[4:] = rng.uniform(0, 0.06, (len(CLASS_NAMES), self.anchors))
+        cloud = self.anchors // 20
+        for d in range(self.defects):
+            cols = slice(d * cloud, (d + 1) * cloud)
+            center = rng.uniform(0.1, 0.9, 2) * content
+            extent = rng.uniform(size / 20, size / 5, 2)
+            raw[:2, cols] = center[:, None] + rng.normal(0, extent.min() / 10, (2, cloud))
+            raw[2:4, cols] = extent[:, None] * rng.uniform(0.8, 1.2, (2, cloud))
+            raw[4 + rng.integers(len(CLASS_NAMES)), cols] = rng.uniform(0.3, 0.95, cloud)
+        return raw
+
+
+def synthetic_image(width, height, seed=SEED):
+    """Panel-like RGB image: cell grid, gradient and noise, so JPEG sizes resemble real captures."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = (60 + 40 * x / width + 20 * y / height).astype(np.float32)
+    base[(x % 160 < 3) | (y % 160 < 3)] = 200
+    image = np.clip(base[..., None] + rng.normal(0, 8, (height, width, 1)), 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(np.repeat(image, 3, axis=2) * np.array([0.8, 0.9, 1.0])).astype(np.uint8)
+
+
+def encode(image, ext=".jpg"):
+    ok, buf = cv2.imencode(ext, cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+    return buf.tobytes()
+
+
+def timed(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.array(samples)
+
+
+class Suite:
+    """Collects benchmark results as flat records: name, parameters and timing percentiles in milliseconds."""
+
+    def __init__(self, repeat, log=sys.stderr):
+        self.repeat = repeat
+        self.log = log
+        self.results = []
+
+    def measure(self, name, fn, repeat=None, warmup=1, items=1, **params):
+        samples = timed(fn, repeat or self.repeat, warmup)
+        result = {
+            "name": name,
+            "params": params,
+            "unit": "ms",
+            "n": len(samples),
+            "median": round(float(np.median(samples)), 3),
+            "p95": round(float(np.percentile(samples, 95)), 3),
+            "mean": round(float(samples.mean()), 3),
+            "min": round(float(samples.min()), 3),
+        }
+        if items != 1:
+            result["items_per_s"] = round(items / (result["median"] / 1000), 2)
+        self.record(result)
+        return result
+
+    def record(self, result):
+        self.results.append(result)
+        extra = f" · {result['items_per_s']}/s" if "items_per_s" in result else ""
+        params = " ".join(f"{k}={v}" for k, v in result["params"].items())
+        print(f"{result['name']:<28} {params:<40} median {result['median']:>10.2f} ms{extra}", file=self.log)
+
+
+def bench_image(suite, detector):
+    for label, (w, h) in RESOLUTIONS.items():
+        image = synthetic_image(w, h)
+        data = encode(image)
+        suite.measure("decode_full", lambda: decode_image(data), resolution=label)
+        suite.measure("decode_reduced", lambda: decode_image(data, min_side=detector.input_size), resolution=label)
+        suite.measure("preprocess", lambda: detector.preprocess([image]), resolution=label)
+        dets = finalize(detect_candidates(image, detector), 0.25)[0]
+        suite.measure("render_preview", lambda: render_preview(image, dets), resolution=label, boxes=len(dets))
+        if label == "24MP":
+            suite.measure("render_full", lambda: render_full(image, dets), repeat=3, resolution=label)
+
+        def end_to_end():
+            pixels, decode = decode_image(data, min_side=detector.input_size)
+            candidates = detect_candidates(pixels, detector).scaled(1 / decode.scale)
+            render_preview(decode_image(data, min_width=1280)[0], finalize(candidates, 0.25)[0])
+
+        # What the Home page's "<2s Processing Time" claims: upload bytes to annotated preview.
+        suite.measure("end_to_end", end_to_end, resolution=label, model=detector.name)
+
+    frame = synthetic_image(640, 640)
+    for batch_size in (1, 8):
+        batch, _ = detector.preprocess([frame] * batch_size)
+        suite.measure("inference", lambda: detector.infer(batch), items=batch_size, batch=batch_size,
+                      model=detector.name)
+    raw_batch, meta = detector.preprocess([frame])
+    raw = detector.infer(raw_batch)
+    suite.measure("decode_output", lambda: detector.decode(raw, meta), model=detector.name)
+    candidates = detector.decode(raw, meta)[0]
+    suite.measure("nms", lambda: postprocess(candidates, 0.25), candidates=len(candidates))
+    many = detector.decode(detector.infer(detector.preprocess([frame] * 8)[0]), meta * 8)
+    tiled = Detections.concat(many)
+    suite.measure("nms", lambda: postprocess(tiled, 0.25, merge=True), candidates=len(tiled), merge=True)
+
+
+def bench_video(suite, detector, frames=120, size=(1280, 720)):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.avi")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, size)
+        image = cv2.cvtColor(synthetic_image(*size), cv2.COLOR_RGB2BGR)
+        for i in range(frames):
+            writer.write(np.roll(image, i * 4, axis=1))
+        writer.release()
+        for options in ({}, {"novelty_threshold": 0.01}, {"keyframe_interval": 5}):
+            suite.measure(
+                "video_throughput",
+                lambda: sum(1 for _ in analyze_video(path, detector, 0.25, tracker=Tracker(), **options)),
+                repeat=max(1, suite.repeat // 5), items=frames, frames=frames, resolution=f"{size[1]}p", **options,
+            )
+
+
+def synthetic_store(path, rows, seed=SEED, chunk=200_000):
+    """Create (once) a store of ``rows`` detections spread over a year; rollups are built by the store on open."""
+    if os.path.exists(path):
+        return DetectionStore(path)
+    # Built under a temporary name so an interrupted run never leaves a short store to be reused.
+    partial = f"{path}.partial"
+    for leftover in (partial, f"{partial}-wal", f"{partial}-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    DetectionStore(partial).conn.close()
+    rng = np.random.default_rng(seed)
+    per_inspection = 50
+    inspections = max(1, rows // per_inspection)
+    now = time.time()
+    ts = np.sort(rng.uniform(now - 365 * 86400, now, inspections))
+    conn = sqlite3.connect(partial)
+    conn.execute("PRAGMA synchronous=OFF")
+    with conn:
+        conn.executemany(
+            "INSERT INTO inspections (id, ts, panel_id, source, media, frames, defects) VALUES (?, ?, ?, ?, 'image', 1, ?)",
+            ((i + 1, float(t), f"PANEL-{i % 5000:04d}", f"synthetic-{i}.jpg", per_inspection) for i, t in enumerate(ts)),
+        )
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        inspection = (np.arange(start, start + n) // per_inspection).clip(max=inspections - 1)
+        types = rng.integers(0, len(CLASS_NAMES), n)
+        xy = rng.uniform(0, 1500, (n, 2))
+        boxes = np.hstack([xy, xy + rng.uniform(10, 200, (n, 2))])
+        with conn:
+            conn.executemany(
+                "INSERT INTO detections (inspection_id, ts, panel_id, defect_type, severity, confidence, frame,"
+                " x1, y1, x2, y2) VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?, ?, ?)",
+                zip(
+                    (inspection + 1).tolist(), ts[inspection].tolist(),
+                    [f"PANEL-{i % 5000:04d}" for i in inspection.tolist()],
+                    types.tolist(), CLASS_SEVERITY[types].tolist(), rng.uniform(0.25, 1, n).tolist(),
+                    *boxes.T.tolist(),
+                ),
+            )
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    os.replace(partial, path)
+    return DetectionStore(path)
+
+
+def bench_dashboard(suite, sizes, data_dir):
+    os.makedirs(data_dir, exist_ok=True)
+    for label in sizes:
+        start = time.perf_counter()
+        store = synthetic_store(os.path.join(data_dir, f"bench-{label}.db"), STORE_SIZES[label])
+        print(f"store {label}: ready in {time.perf_counter() - start:.1f}s", file=suite.log)
+        first, last = store.time_span()
+
+        def cold(fn):
+            def run():
+                query_cache.invalidate()
+                return fn()
+            return run
+
+        suite.measure("dashboard_datasets", cold(lambda: load_datasets(store)), rows=label)
+        suite.measure("dashboard_datasets_cached", lambda: load_datasets(store), rows=label)
+        for resolution in ("Auto", "Minute"):
+            suite.measure("trend", cold(lambda: load_trend(first, last, resolution, store=store)),
+                          rows=label, resolution=resolution)
+        suite.measure("history_page", lambda: history_frame(store.history_page(limit=50)[0]), rows=label, page="first")
+        deep = store.history_page(limit=50, after=(first + (last - first) * 0.1, 0))[0][-1]
+        suite.measure("history_page", lambda: store.history_page(limit=50, after=(deep["ts"], deep["id"])),
+                      rows=label, page="deep")
+        filtered = HistoryFilter(defect_types=(0,), severities=(0,), min_confidence=0.9)
+        suite.measure("history_page", lambda: store.history_page(filtered, limit=50), rows=label, page="filtered")
+
+        datasets = load_datasets(store)
+        trend, _, _ = load_trend(first, last, "Minute", store=store)
+
+        def figures():
+            sizes = 0
+            for fig in (
+                go.Figure(go.Bar(x=datasets["by_type"]["Defect Type"], y=datasets["by_type"]["Count"])),
+                go.Figure(go.Pie(labels=datasets["by_severity"]["Severity"], values=datasets["by_severity"]["Count"])),
+                go.Figure(go.Scattergl(x=trend["Date"], y=trend["Defects"], mode="lines")),
+            ):
+                sizes += len(fig.to_json())
+            return sizes
+
+        result = suite.measure("dashboard_figures", figures, rows=label)
+        result["payload_bytes"] = figures()
+        store.conn.close()
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+    }
+
+
+def _key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results, baseline, threshold=0.2, min_delta_ms=1.0, log=sys.stdout):
+    """Print median changes against a previous results file; returns the regressions.
+
+    A regression is a median slower by more than ``threshold`` and by more
+    than ``min_delta_ms``, so sub-millisecond jitter is not reported.
+    """
+    before = {_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = before.get(_key(result))
+        if old is None or not old["median"]:
+            continue
+        change = result["median"] / old["median"] - 1
+        regressed = change > threshold and result["median"] - old["median"] > min_delta_ms
+        params = " ".join(f"{k}={v}" for k, v in result["params"].items())
+        print(
+            f"{result['name']:<28} {params:<40} {old['median']:>10.2f} -> {result['median']:>10.2f} ms "
+            f"({change:+.0%}){' REGRESSION' if regressed else ''}",
+            file=log,
+        )
+        if regressed:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.bench",
+        description="Offline benchmarks of the detection and dashboard hot paths, written as JSON.",
+    )
+    parser.add_argument("--out", default="bench-results.json", help="Results file (default: bench-results.json)")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per benchmark (default: 10)")
+    parser.add_argument(
+        "--only", nargs="+", choices=["image", "video", "dashboard"], default=["image", "video", "dashboard"],
+    )
+    parser.add_argument(
+        "--store-sizes", nargs="+", choices=list(STORE_SIZES), default=list(STORE_SIZES),
+        help="Synthetic store sizes for the dashboard benchmarks (default: all)",
+    )
+    parser.add_argument(
+        "--data-dir", default=os.path.join(tempfile.gettempdir(), "pv-bench"),
+        help="Where synthetic stores are generated once and reused",
+    )
+    parser.add_argument("--model", action="store_true", help=f"Also benchmark the deployed model ({MODEL_PATH})")
+    parser.add_argument("--compare", metavar="BASELINE", help="Results file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative median slowdown counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    suite = Suite(args.repeat)
+    detectors = [StubDetector()]
+    if args.model and os.path.exists(MODEL_PATH):
+        detectors.append(OnnxDetector(MODEL_PATH))
+    for detector in detectors:
+        if "image" in args.only:
+            bench_image(suite, detector)
+        if "video" in args.only:
+            bench_video(suite, detector)
+    if "dashboard" in args.only:
+        bench_dashboard(suite, args.store_sizes, args.data_dir)
+
+    report = {"environment": environment(), "results": suite.results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(suite.results)} results to {args.out}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            return 1 if compare(suite.results, json.load(f), args.threshold, args.min_delta_ms) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
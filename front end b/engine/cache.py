@@ -0,0 +1,141 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .detector import Detections
+
+MEMORY_ITEMS = int(os.environ.get("PV_CACHE_MEMORY_ITEMS", "128"))
+DISK_DIR = os.environ.get("PV_CACHE_DIR")
+DISK_MAX_BYTES = int(float(os.environ.get("PV_CACHE_DISK_MB", "512")) * 1024 * 1024)
+
+
+def result_key(data, model_version, **params):
+    """Content address for an analysis: upload bytes, model version and any inference parameters."""
+    h = hashlib.blake2b(data, digest_size=16)
+    h.update(model_version.encode())
+    for name in sorted(params):
+        h.update(f"|{name}={params[name]}".encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache of raw detection candidates: an in-memory LRU in front of an optional on-disk store.
+
+    The disk tier keeps one ``.npz`` per key and evicts least recently used
+    files once ``disk_max_bytes`` is exceeded.
+    """
+
+    def __init__(self, memory_items=MEMORY_ITEMS, disk_dir=DISK_DIR, disk_max_bytes=DISK_MAX_BYTES):
+        self.memory_items = memory_items
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(e.stat().st_size for e in os.scandir(disk_dir) if e.name.endswith(".npz"))
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                value = Detections(data["boxes"], data["scores"], data["class_ids"])
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        return value
+
+    def _write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, boxes=value.boxes, scores=value.scores, class_ids=value.class_ids)
+        replaced = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+        with self._lock:
+            self._disk_bytes += os.path.getsize(path) - replaced
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        entries = sorted(
+            (e for e in os.scandir(self.disk_dir) if e.name.endswith(".npz")),
+            key=lambda e: e.stat().st_mtime,
+        )
+        total = sum(e.stat().st_size for e in entries)
+        for entry in entries:
+            if total <= self.disk_max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide result cache shared by all sessions."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from .querycache import QueryCache
+from .store import get_store
+
+QUERY_TTLS = {
+    "totals": 30,
+    "by_type": 60,
+    "by_severity": 60,
+    "trend": 300,
+}
+
+# Bin widths in minutes; weeks start on Monday (the epoch was a Thursday).
+RESOLUTIONS = {"Minute": 1, "Hour": 60, "Day": 1440, "Week": 10080}
+RESOLUTION_OFFSETS = {"Week": 3 * 1440}
+TREND_MAX_POINTS = 2000
+WEBGL_THRESHOLD = 1000
+
+
+def _totals(store):
+    return store.totals()
+
+
+def _by_type(store):
+    return pd.DataFrame(list(store.counts_by_type().items()), columns=["Defect Type", "Count"])
+
+
+def _by_severity(store):
+    return pd.DataFrame(list(store.counts_by_severity().items()), columns=["Severity", "Count"])
+
+
+LOADERS = {
+    "totals": _totals,
+    "by_type": _by_type,
+    "by_severity": _by_severity,
+}
+
+query_cache = QueryCache()
+
+
+def load_datasets(store=None):
+    """Every dashboard dataset, served from the shared cache while neither its TTL nor a write has expired it.
+
+    The store's write version is read once per call, so a page run costs one
+    primary-key lookup when everything is cached. Returned objects are shared
+    between sessions and must not be mutated.
+    """
+    store = store or get_store()
+    version = store.write_version()
+    return {
+        name: query_cache.get(name, lambda loader=loader: loader(store), QUERY_TTLS[name], version)
+        for name, loader in LOADERS.items()
+    }
+
+
+def auto_resolution(start, end, max_points=TREND_MAX_POINTS):
+    """Finest resolution whose bin count over ``start``..``end`` fits in ``max_points`` without downsampling."""
+    minutes = (end - start) / 60
+    for name, width in RESOLUTIONS.items():
+        if minutes / width <= max_points:
+            return name
+    return "Week"
+
+
+def minmax_downsample(x, y, max_points=TREND_MAX_POINTS):
+    """Keep the minimum and maximum of each of ``max_points // 2`` equal buckets, in time order.
+
+    Every peak and trough of the full series survives, so the drawn shape
+    matches the full-resolution line at any width up to ``max_points / 2`` px.
+    """
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    buckets = max_points // 2
+    width = -(-n // buckets)
+    padded = np.pad(y, (0, buckets * width - n), mode="edge").reshape(buckets, width)
+    base = np.arange(buckets)[:, None] * width
+    picks = np.sort(np.stack([padded.argmin(axis=1), padded.argmax(axis=1)], axis=1) + base, axis=1)
+    index = np.unique(np.minimum(picks.ravel(), n - 1))
+    return x[index], y[index]
+
+
+def _trend(store, start, end, resolution, max_points):
+    edges, counts = store.binned_counts(start, end, RESOLUTIONS[resolution], RESOLUTION_OFFSETS.get(resolution, 0))
+    x, y = minmax_downsample(edges, counts, max_points)
+    return pd.DataFrame({"Date": pd.to_datetime(x, unit="s"), "Defects": y}), len(counts)
+
+
+def load_trend(start, end, resolution="Auto", max_points=TREND_MAX_POINTS, store=None):
+    """Defects per ``resolution`` bin between ``start`` and ``end`` (epoch seconds), at most ``max_points`` points.
+
+    Returns the (possibly min/max downsampled) frame, the number of bins
+    before downsampling, and the resolution used. Cached per window like the
+    other datasets.
+    """
+    store = store or get_store()
+    if resolution == "Auto":
+        resolution = auto_resolution(start, end, max_points)
+    key = ("trend", start, end, resolution, max_points)
+    frame, bins = query_cache.get(
+        key, lambda: _trend(store, start, end, resolution, max_points), QUERY_TTLS["trend"], store.write_version()
+    )
+    return frame, bins, resolution
+
+
+def history_frame(rows):
+    """Display frame for one page of ``DetectionStore.history_page`` rows."""
+    history = pd.DataFrame(rows, columns=["ts", "panel_id", "defect_type", "severity", "confidence"])
+    history.columns = ["Timestamp", "Panel ID", "Defect Type", "Severity", "Confidence"]
+    history["Timestamp"] = pd.to_datetime(history["Timestamp"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+    history["Confidence"] = history["Confidence"].apply(lambda x: f"{x:.1%}")
+    return history
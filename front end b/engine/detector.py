@@ -0,0 +1,407 @@
+import os
+import threading
+import warnings
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+CLASS_NAMES = ["Cracks", "Hotspots", "Scratches", "Broken Grids", "Defaced", "Dust", "Bird Droppings"]
+SEVERITIES = ["High", "Medium", "Low"]
+CLASS_SEVERITY = np.array([0, 1, 1, 0, 2, 2, 2], dtype=np.int8)
+
+MODEL_PATH = os.environ.get(
+    "PV_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "pv_defects.onnx"),
+)
+INPUT_SIZE = int(os.environ.get("PV_INPUT_SIZE", "640"))
+PRECISIONS = ("fp32", "int8")
+PRECISION = os.environ.get("PV_PRECISION", "fp32")
+CALIBRATION_DIR = os.environ.get(
+    "PV_CALIBRATION_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "calibration"),
+)
+CALIBRATION_IMAGES = 16
+# Appended to the recorded source of inspections made by the heuristic fallback, so
+# the Dashboard and exports never pass its guesses off as model detections.
+FALLBACK_TAG = " (classical fallback)"
+
+
+@dataclass
+class Detections:
+    """Boxes (xyxy, pixels), scores and class ids for one image, held as arrays."""
+
+    boxes: np.ndarray = field(default_factory=lambda: np.zeros((0, 4), dtype=np.float32))
+    scores: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float32))
+    class_ids: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __getitem__(self, index):
+        return Detections(self.boxes[index], self.scores[index], self.class_ids[index])
+
+    @classmethod
+    def concat(cls, parts):
+        parts = list(parts)
+        if not parts:
+            return cls()
+        return cls(
+            np.concatenate([p.boxes for p in parts]),
+            np.concatenate([p.scores for p in parts]),
+            np.concatenate([p.class_ids for p in parts]),
+        )
+
+    def scaled(self, factor):
+        return Detections(self.boxes * np.float32(factor), self.scores, self.class_ids)
+
+    @property
+    def severity_ids(self):
+        return CLASS_SEVERITY[self.class_ids]
+
+    def to_records(self):
+        boxes = np.round(self.boxes).astype(int).tolist()
+        return [
+            {
+                "type": CLASS_NAMES[c],
+                "confidence": float(s),
+                "bbox": tuple(b),
+                "severity": SEVERITIES[v],
+            }
+            for b, s, c, v in zip(boxes, self.scores.tolist(), self.class_ids.tolist(), self.severity_ids.tolist())
+        ]
+
+
+class Detector:
+    """CPU detector split into preprocess / infer / decode so callers can time and report each stage."""
+
+    name = "base"
+    version = "0"
+    precision = "fp32"
+    input_size = INPUT_SIZE
+    fallback = False  # True for the untrained heuristic used when no model is deployed
+
+    def prepare(self, image):
+        """Return ``(input, meta)`` for one image."""
+        raise NotImplementedError
+
+    def collate(self, inputs):
+        return inputs
+
+    def concat_batches(self, batches):
+        """Join collated batches into one so a single ``infer`` call serves them all."""
+        return [item for batch in batches for item in batch]
+
+    def preprocess(self, images):
+        prepared = [self.prepare(img) for img in images]
+        return self.collate([p[0] for p in prepared]), [p[1] for p in prepared]
+
+    def infer(self, batch):
+        raise NotImplementedError
+
+    def decode(self, raw, meta):
+        raise NotImplementedError
+
+    def detect_batch(self, images):
+        batch, meta = self.preprocess(images)
+        return self.decode(self.infer(batch), meta)
+
+    def detect(self, image):
+        return self.detect_batch([image])[0]
+
+    def warmup(self):
+        self.detect(np.zeros((INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8))
+
+
+def calibration_images(directory=CALIBRATION_DIR, limit=CALIBRATION_IMAGES):
+    """Up to ``limit`` RGB images from ``directory``, evenly spread over its sorted file list."""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")))
+    picked = [names[i] for i in np.linspace(0, len(names) - 1, min(limit, len(names))).astype(int)] if names else []
+    images = [cv2.imread(os.path.join(directory, name), cv2.IMREAD_COLOR) for name in picked]
+    return [cv2.cvtColor(image, cv2.COLOR_BGR2RGB) for image in images if image is not None]
+
+
+def _split_head(path):
+    """Serialized ``(body, head)`` of the ONNX model at ``path``, cut after its last convolutions.
+
+    The head is everything between those convolutions and the output; for
+    YOLOv8, box decoding, the class sigmoid and the concatenation of pixel
+    coordinates with 0-1 scores. Quantized with the rest, the scores would
+    share one int8 scale with the coordinates and round to nothing.
+    """
+    import onnx
+    import onnx.utils
+
+    model = onnx.load(path)
+    graph = model.graph
+    producers = {name: node for node in graph.node for name in node.output}
+    constants = {init.name for init in graph.initializer}
+    boundary, seen, pending = set(), set(), [out.name for out in graph.output]
+    while pending:
+        name = pending.pop()
+        if name in seen or name in constants:
+            continue
+        seen.add(name)
+        node = producers.get(name)
+        if node is None:
+            raise ValueError(f"{path}: output depends on input {name!r} without a convolution in between")
+        if node.op_type == "Conv":
+            boundary.add(name)
+        else:
+            pending.extend(node.input)
+    boundary = sorted(boundary)
+    extractor = onnx.utils.Extractor(model)
+    return tuple(
+        np.frombuffer(part.SerializeToString(), dtype=np.uint8)
+        for part in (
+            extractor.extract_model([inp.name for inp in graph.input if inp.name not in constants], boundary),
+            extractor.extract_model(boundary, [out.name for out in graph.output]),
+        )
+    )
+
+
+class OnnxDetector(Detector):
+    """YOLOv8 ONNX export run through OpenCV DNN on the CPU.
+
+    With ``precision="int8"`` the network up to its last convolutions is
+    quantized when loaded (OpenCV's ``Net.quantize``, per-channel weights)
+    using activation ranges observed on ``calibration`` images, by default
+    those in ``CALIBRATION_DIR``; the decoding head stays float. This needs
+    the ``onnx`` package. Inputs and outputs are float either way, so
+    preprocessing and decoding are shared.
+    """
+
+    name = "onnx"
+
+    def __init__(self, path, input_size=INPUT_SIZE, candidate_threshold=0.05, precision="fp32", calibration=None):
+        if precision not in PRECISIONS:
+            raise ValueError(f"unknown precision {precision!r}, expected one of {PRECISIONS}")
+        self.input_size = input_size
+        self.candidate_threshold = candidate_threshold
+        self.precision = precision
+        self.head = None
+        if precision == "int8":
+            body, head = _split_head(path)
+            calibration = self._calibration_batch(calibration)
+            self.net = cv2.dnn.readNetFromONNX(body).quantize([calibration], cv2.CV_32F, cv2.CV_32F, True)
+            self.head = cv2.dnn.readNetFromONNX(head)
+            self._body_outputs = self.net.getUnconnectedOutLayersNames()
+        else:
+            self.net = cv2.dnn.readNetFromONNX(path)
+        for net in (self.net, self.head):
+            if net is not None:
+                net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+                net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.version = f"{os.path.basename(path)}:{int(os.path.getmtime(path))}"
+        if precision != "fp32":
+            self.version += f":{precision}"
+        self._lock = threading.Lock()
+
+    def _calibration_batch(self, images):
+        images = calibration_images() if images is None else images
+        if not images:
+            warnings.warn(
+                f"no calibration images in {CALIBRATION_DIR}; quantizing on noise, expect an accuracy loss",
+                stacklevel=3,
+            )
+            rng = np.random.default_rng(0)
+            images = [rng.integers(0, 256, (self.input_size, self.input_size, 3), dtype=np.uint8) for _ in range(4)]
+        return self.collate([self.prepare(image)[0] for image in images])
+
+    def prepare(self, image):
+        size = self.input_size
+        h, w = image.shape[:2]
+        scale = min(size / w, size / h)
+        nw, nh = int(round(w * scale)), int(round(h * scale))
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        canvas[:nh, :nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        return canvas, (scale, w, h)
+
+    def collate(self, inputs):
+        size = self.input_size
+        return cv2.dnn.blobFromImages(inputs, scalefactor=1 / 255.0, size=(size, size), swapRB=False, crop=False)
+
+    def concat_batches(self, batches):
+        return batches[0] if len(batches) == 1 else np.concatenate(batches)
+
+    def infer(self, batch):
+        with self._lock:
+            self.net.setInput(batch)
+            if self.head is None:
+                return self.net.forward()
+            for name, blob in zip(self._body_outputs, self.net.forward(self._body_outputs)):
+                # A quantized net names each float output after the layer it dequantizes.
+                self.head.setInput(blob, name.removeprefix("dequantize/"))
+            return self.head.forward()
+
+    def decode(self, raw, meta):
+        results = []
+        for pred, (scale, w, h) in zip(raw, meta):
+            pred = pred.T
+            class_scores = pred[:, 4:]
+            class_ids = class_scores.argmax(axis=1)
+            scores = class_scores[np.arange(len(pred)), class_ids]
+            keep = scores >= self.candidate_threshold
+            cx, cy, bw, bh = pred[keep, :4].T
+            boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1) / scale
+            np.clip(boxes, 0, [w, h, w, h], out=boxes)
+            results.append(Detections(boxes.astype(np.float32), scores[keep].astype(np.float32),
+                                      class_ids[keep].astype(np.int32)))
+        return results
+
+
+class ClassicalDetector(Detector):
+    """Morphology-based fallback used when no ONNX model is deployed.
+
+    Dark thin structures become crack candidates, dark compact blobs soiling and
+    bright blobs hotspots, scored by their local contrast. Components barely above
+    the noise floor, spanning most of the image or repeating on a lattice (the
+    panel's own cell and busbar grid) are dropped.
+    """
+
+    name = "classical"
+    version = "classical-2"
+    fallback = True
+
+    def __init__(self, input_size=INPUT_SIZE, min_area=12, min_contrast=10.0, max_span=0.5, min_repeats=8):
+        self.input_size = input_size
+        self.min_area = min_area
+        self.min_contrast = min_contrast
+        self.max_span = max_span
+        self.min_repeats = min_repeats
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (31, 31))
+
+    def prepare(self, image):
+        h, w = image.shape[:2]
+        scale = min(1.0, self.input_size / max(w, h))
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if image.ndim == 3 else image
+        if scale < 1.0:
+            gray = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(gray, (3, 3), 0), (scale, w, h)
+
+    def infer(self, batch):
+        raw = []
+        for gray in batch:
+            dark = cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, self.kernel)
+            bright = cv2.morphologyEx(gray, cv2.MORPH_TOPHAT, self.kernel)
+            raw.append((self._components(dark, dark=True), self._components(bright, dark=False)))
+        return raw
+
+    def _components(self, response, dark):
+        _, mask = cv2.threshold(response, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        n, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        stats = stats[1:]
+        if not len(stats):
+            return np.zeros((0, 6), dtype=np.float32)
+        contrast = np.bincount(labels.ravel(), weights=response.ravel(), minlength=n)[1:]
+        x, y, bw, bh, area = stats.T.astype(np.float32)
+        elongation = np.maximum(bw, bh) / np.maximum(np.minimum(bw, bh), 1)
+        if dark:
+            cls = np.where(elongation >= 3, CLASS_NAMES.index("Cracks"), CLASS_NAMES.index("Bird Droppings"))
+        else:
+            cls = np.full(len(stats), CLASS_NAMES.index("Hotspots"))
+        # Mean response over the component, mapped into [0, 1) without saturating so
+        # strong and very strong blobs still rank apart; 32 grey levels scores 0.5.
+        mean = contrast / area
+        score = mean / (mean + 32.0)
+        out = np.stack([x, y, x + bw, y + bh, score, cls], axis=1)
+        h, w = response.shape
+        keep = (area >= self.min_area) & (mean >= self.min_contrast) & (bw <= self.max_span * w) & (bh <= self.max_span * h)
+        keep[keep] = ~self._on_grid(out[keep])
+        return out[keep]
+
+    def _on_grid(self, out):
+        """Mask of components that tile the image at a regular pitch, grouped by class and size (~20% bins)."""
+        grid = np.zeros(len(out), dtype=bool)
+        size = np.maximum(out[:, 2:4] - out[:, 0:2], 1)
+        centers = (out[:, 0:2] + out[:, 2:4]) / 2
+        key = np.column_stack([out[:, 5], np.round(np.log2(size) * 4)])
+        _, group, counts = np.unique(key, axis=0, return_inverse=True, return_counts=True)
+        group = group.ravel()
+        for g in np.flatnonzero(counts >= self.min_repeats):
+            members = np.flatnonzero(group == g)
+            on = np.ones(len(members), dtype=bool)
+            for axis in (0, 1):
+                c = np.sort(centers[members, axis])
+                extent = np.median(size[members, axis])
+                # Collapse members sharing a row or column into that line's mean position.
+                starts = np.r_[0, np.flatnonzero(np.diff(c) > extent / 2) + 1]
+                lines = np.add.reduceat(c, starts) / np.diff(np.r_[starts, len(c)])
+                if len(lines) < 2:
+                    on &= np.abs(centers[members, axis] - lines[0]) <= 0.15 * extent
+                    continue
+                # Count each gap as a whole number of rough pitches and average over all of
+                # them, so a fraction of a pixel of error does not drift the phase over many cells.
+                steps = np.diff(lines)
+                multiples = np.round(steps / np.median(steps))
+                pitch = steps[multiples > 0].sum() / multiples.sum()
+                phase = centers[members, axis] / pitch
+                offset = np.angle(np.exp(2j * np.pi * phase).mean()) / (2 * np.pi)
+                on &= np.abs((phase - offset + 0.5) % 1 - 0.5) <= 0.15
+            if on.mean() >= 0.7:
+                grid[members[on]] = True
+        return grid
+
+    def decode(self, raw, meta):
+        results = []
+        for (dark, bright), (scale, w, h) in zip(raw, meta):
+            cand = np.concatenate([dark, bright])
+            boxes = cand[:, :4] / scale
+            np.clip(boxes, 0, [w, h, w, h], out=boxes)
+            results.append(Detections(boxes.astype(np.float32), cand[:, 4].astype(np.float32),
+                                      cand[:, 5].astype(np.int32)))
+        return results
+
+
+def source_label(source, fallback):
+    """``source`` as recorded for an inspection, tagged when the detections came from the fallback."""
+    return f"{source}{FALLBACK_TAG}" if fallback and source is not None else source
+
+
+def available_precisions(path=MODEL_PATH):
+    """Precisions ``load_detector`` can honour: INT8 quantizes the ONNX model, so it needs one at ``path``."""
+    return PRECISIONS if os.path.exists(path) else PRECISIONS[:1]
+
+
+def load_detector(path=MODEL_PATH, precision=PRECISION):
+    """Warm detector for the model at ``path``; the classical fallback, which has no INT8 mode, if there is none."""
+    if os.path.exists(path):
+        detector = OnnxDetector(path, precision=precision)
+    else:
+        if precision not in available_precisions(path):
+            warnings.warn(f"no ONNX model at {path}; running the classical detector at FP32, not {precision}",
+                          stacklevel=2)
+        detector = ClassicalDetector()
+    detector.warmup()
+    return detector
+
+
+def _usable(precision):
+    return precision if precision in available_precisions() else PRECISIONS[0]
+
+
+_detectors = {}
+_detector_lock = threading.Lock()
+
+
+def get_detector(precision=PRECISION):
+    """Process-wide warm detector for ``precision``, shared by every session, rerun and worker thread.
+
+    Without an ONNX model there is nothing to quantize, so INT8 gets the FP32
+    detector; check ``available_precisions()`` to tell the user.
+    """
+    precision = _usable(precision)
+    if precision not in _detectors:
+        with _detector_lock:
+            if precision not in _detectors:
+                _detectors[precision] = load_detector(precision=precision)
+    return _detectors[precision]
+
+
+def preload_detector(precision=PRECISION):
+    """Load and warm the shared detector in the background so the first analysis doesn't pay for it."""
+    precision = _usable(precision)
+    if precision not in _detectors:
+        threading.Thread(target=get_detector, args=(precision,), name="detector-preload", daemon=True).start()
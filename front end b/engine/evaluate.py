@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from .batch import analyze_file, find_images
+from .detector import CALIBRATION_DIR, MODEL_PATH, PRECISIONS, Detections, OnnxDetector, calibration_images, load_detector
+from .ingest import image_size
+from .postprocess import DEFAULT_CONFIDENCE
+from .tracking import _iou_matrix
+
+REPORT_PATH = os.environ.get(
+    "PV_EVAL_REPORT",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "evaluation.json"),
+)
+MATCH_IOU = 0.5
+
+
+def label_path(image_path):
+    """YOLO label file for an image: ``name.txt`` beside it, or under the sibling ``labels/`` of an ``images/`` dir."""
+    stem = os.path.splitext(image_path)[0]
+    beside = f"{stem}.txt"
+    if os.path.exists(beside):
+        return beside
+    parts = stem.split(os.sep)
+    if "images" in parts:
+        i = len(parts) - 1 - parts[::-1].index("images")
+        return os.sep.join(parts[:i] + ["labels"] + parts[i + 1:]) + ".txt"
+    return beside
+
+
+def read_labels(path, width, height):
+    """Ground truth from a YOLO label file (``class cx cy w h``, normalized); a missing file means no defects."""
+    if not os.path.exists(path):
+        return Detections()
+    rows = np.loadtxt(path, ndmin=2, dtype=np.float32)
+    if not rows.size:
+        return Detections()
+    cx, cy, w, h = (rows[:, 1:5] * np.array([width, height, width, height], dtype=np.float32)).T
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return Detections(boxes, np.ones(len(rows), dtype=np.float32), rows[:, 0].astype(np.int32))
+
+
+def load_samples(paths):
+    """``[(image_path, truth)]`` for ``paths``, labels scaled to each image's size."""
+    samples = []
+    for path in paths:
+        with open(path, "rb") as f:
+            width, height = image_size(f.read())[0]
+        samples.append((path, read_labels(label_path(path), width, height)))
+    return samples
+
+
+def match(predicted, truth, iou=MATCH_IOU):
+    """``(tp, fp, fn)``: predictions matched to same-class ground truth at ``iou``, highest score first."""
+    if not len(predicted) or not len(truth):
+        return 0, len(predicted), len(truth)
+    overlap = _iou_matrix(predicted.boxes, truth.boxes)
+    overlap[predicted.class_ids[:, None] != truth.class_ids[None, :]] = 0
+    used = np.zeros(len(truth), dtype=bool)
+    tp = 0
+    for p in np.argsort(-predicted.scores, kind="stable"):
+        candidates = np.where(used, 0, overlap[p])
+        best = int(candidates.argmax())
+        if candidates[best] >= iou:
+            used[best] = True
+            tp += 1
+    return tp, len(predicted) - tp, len(truth) - tp
+
+
+def evaluate(detector, samples, confidence=DEFAULT_CONFIDENCE, iou=MATCH_IOU, tiled=None, log=sys.stderr):
+    """Run ``detector`` over ``[(image_path, truth)]`` with the Detection page's pipeline and score it.
+
+    Latency is per image, from file bytes to finalized detections. Returns
+    a dict of latency percentiles, throughput, precision, recall, F1 and
+    the per-image rows.
+    """
+    images = []
+    tp = fp = fn = 0
+    start = time.perf_counter()
+    for path, truth in samples:
+        image_start = time.perf_counter()
+        dets, _, _ = analyze_file(path, detector, confidence, None, tiled)
+        latency = (time.perf_counter() - image_start) * 1000
+        counts = match(dets, truth, iou)
+        tp, fp, fn = tp + counts[0], fp + counts[1], fn + counts[2]
+        images.append({"path": path, "latency_ms": round(latency, 2), "tp": counts[0], "fp": counts[1], "fn": counts[2]})
+    elapsed = time.perf_counter() - start
+    latencies = np.array([image["latency_ms"] for image in images])
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    result = {
+        "precision_mode": detector.precision,
+        "model": detector.name,
+        "version": detector.version,
+        "images": len(images),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 2),
+            "p50": round(float(np.median(latencies)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+        },
+        "images_per_s": round(len(images) / elapsed, 2) if elapsed else 0.0,
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+        "per_image": images,
+    }
+    print(
+        f"{detector.precision:<5} {result['latency_ms']['mean']:>8.1f} ms/image (p95 {result['latency_ms']['p95']:.1f})"
+        f" · {result['images_per_s']:>6.2f} images/s · precision {precision:.3f} · recall {recall:.3f}"
+        f" · F1 {result['f1']:.3f}",
+        file=log,
+    )
+    return result
+
+
+def load_report(path=REPORT_PATH):
+    """The last comparison written by ``python -m engine.evaluate``, or ``None`` if there is none."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.evaluate",
+        description="Compare FP32 and INT8 inference on a labelled image folder: latency, throughput, precision "
+                    "and recall. Labels are YOLO .txt files beside the images or in a sibling labels/ folder.",
+    )
+    parser.add_argument("folder", help="Labelled images")
+    parser.add_argument("--model", default=MODEL_PATH, help=f"ONNX model (default: {MODEL_PATH})")
+    parser.add_argument("--precisions", nargs="+", choices=PRECISIONS, default=list(PRECISIONS))
+    parser.add_argument(
+        "--calibration", default=CALIBRATION_DIR,
+        help="Images INT8 activation ranges are calibrated on; keep them apart from the evaluation set "
+             f"(default: {CALIBRATION_DIR}, as the app uses)",
+    )
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE,
+                        help=f"Minimum confidence (default: {DEFAULT_CONFIDENCE})")
+    parser.add_argument("--iou", type=float, default=MATCH_IOU,
+                        help=f"IoU a detection needs with a label to count (default: {MATCH_IOU})")
+    tiling = parser.add_mutually_exclusive_group()
+    tiling.add_argument("--tiled", dest="tiled", action="store_true", default=None, help="Always use tiled inference")
+    tiling.add_argument("--no-tiled", dest="tiled", action="store_false", help="Never use tiled inference")
+    parser.add_argument("--out", default=REPORT_PATH, help=f"Report the Dashboard reads (default: {REPORT_PATH})")
+    parser.add_argument("--per-image", action="store_true", help="Also print each image's latency and matches")
+    args = parser.parse_args(argv)
+
+    paths = find_images([args.folder])
+    if not paths:
+        parser.error("no images found")
+    if not any(os.path.exists(label_path(path)) for path in paths):
+        parser.error(f"no YOLO label files found for the images in {args.folder}")
+    samples = load_samples(paths)
+    print(f"{len(samples)} images, {sum(len(truth) for _, truth in samples)} labelled defects", file=sys.stderr)
+
+    results = []
+    for precision in args.precisions:
+        if os.path.exists(args.model):
+            calibration = calibration_images(args.calibration) if precision == "int8" else None
+            detector = OnnxDetector(args.model, precision=precision, calibration=calibration)
+            detector.warmup()
+        elif precision == "fp32":
+            detector = load_detector(args.model)
+        else:
+            print(f"{precision}: skipped, no model at {args.model}", file=sys.stderr)
+            continue
+        result = evaluate(detector, samples, args.confidence, args.iou, args.tiled)
+        results.append(result)
+        if args.per_image:
+            for image in result["per_image"]:
+                print(f"    {image['latency_ms']:>8.1f} ms  tp {image['tp']} fp {image['fp']} fn {image['fn']}  "
+                      f"{os.path.relpath(image['path'], args.folder)}", file=sys.stderr)
+
+    report = {
+        "created": time.time(),
+        "dataset": os.path.abspath(args.folder),
+        "images": len(samples),
+        "labels": sum(len(truth) for _, truth in samples),
+        "confidence": args.confidence,
+        "iou": args.iou,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import functools
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .detector import CLASS_NAMES, SEVERITIES
+
+CHUNK_ROWS = 50_000
+SPOOL_BYTES = 32 * 1024 * 1024
+# st.download_button takes the whole file as bytes and Streamlit keeps a copy of them, so a
+# download costs its full size in RAM twice over; larger exports are stopped and refused.
+DOWNLOAD_MAX_BYTES = int(float(os.environ.get("PV_EXPORT_DOWNLOAD_MB", "200")) * 1024 * 1024)
+
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+@dataclass
+class ExportResult:
+    file: object
+    format: str
+    rows: int
+    size: int
+    elapsed_ms: float
+    truncated: bool = False
+
+    @property
+    def file_name(self):
+        return f"defect_report.{FORMATS[self.format][0]}"
+
+    @property
+    def mime(self):
+        return FORMATS[self.format][1]
+
+    @property
+    def memory_bytes(self):
+        """Bytes the spooled file holds in RAM: all of it until it rolls over to disk, none after."""
+        return 0 if self.file._rolled else self.size
+
+
+@functools.lru_cache(maxsize=None)
+def schema():
+    """Arrow schema of an export, built on first use so the Dashboard doesn't load pyarrow until it exports."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("Timestamp", pa.timestamp("s")),
+        ("Panel ID", pa.string()),
+        ("Defect Type", pa.dictionary(pa.int8(), pa.string())),
+        ("Severity", pa.dictionary(pa.int8(), pa.string())),
+        ("Confidence", pa.float32()),
+        ("Inspection", pa.int64()),
+        ("Frame", pa.int32()),
+        ("X1", pa.float32()),
+        ("Y1", pa.float32()),
+        ("X2", pa.float32()),
+        ("Y2", pa.float32()),
+    ])
+
+
+def chunk_table(rows):
+    """Arrow table in ``schema()`` for one ``DetectionStore.iter_history`` chunk; type and severity stay dictionary-encoded."""
+    import pyarrow as pa
+
+    fields = list(schema())
+    columns = list(zip(*rows)) or [()] * len(fields)
+    ts, panel_id, defect_type, severity = columns[:4]
+    return pa.Table.from_arrays([
+        pa.array(np.array(ts, dtype=np.float64).astype(np.int64).astype("datetime64[s]"), fields[0].type),
+        pa.array(panel_id, pa.string()),
+        pa.DictionaryArray.from_arrays(pa.array(defect_type, pa.int8()), pa.array(CLASS_NAMES)),
+        pa.DictionaryArray.from_arrays(pa.array(severity, pa.int8()), pa.array(SEVERITIES)),
+        *(pa.array(column, field.type) for column, field in zip(columns[4:], fields[4:])),
+    ], schema=schema())
+
+
+def _csv_writer(out):
+    import pyarrow.csv as pa_csv
+
+    return pa_csv.CSVWriter(out, schema())
+
+
+def _parquet_writer(out):
+    import pyarrow.parquet as pq
+
+    return pq.ParquetWriter(out, schema(), compression="zstd")
+
+
+WRITERS = {"CSV": _csv_writer, "Parquet": _parquet_writer}
+
+
+def export_history(store, filters=None, format="CSV", chunk_rows=CHUNK_ROWS, spool_bytes=SPOOL_BYTES,
+                   max_bytes=None, on_progress=None):
+    """Stream every detection matching ``filters`` into a spooled temp file as CSV or Parquet.
+
+    Rows are read, converted and written ``chunk_rows`` at a time (one
+    Parquet row group per chunk), so memory is bounded by one chunk plus at
+    most ``spool_bytes`` of output before the file rolls over to disk.
+    Once the output passes ``max_bytes`` no further chunks are written and
+    the result is marked ``truncated``. ``on_progress(rows_written)`` is
+    called after each chunk. The returned file is positioned at the start;
+    the caller owns it and must close it.
+    """
+    start = time.perf_counter()
+    out = tempfile.SpooledTemporaryFile(max_size=spool_bytes, prefix="pv-export-")
+    rows = 0
+    truncated = False
+    try:
+        writer = WRITERS[format](out)
+        try:
+            for chunk in store.iter_history(filters, chunk_rows):
+                if max_bytes is not None and out.tell() > max_bytes:
+                    truncated = True
+                    break
+                writer.write_table(chunk_table(chunk))
+                rows += len(chunk)
+                if on_progress:
+                    on_progress(rows)
+        finally:
+            writer.close()
+    except BaseException:
+        out.close()
+        raise
+    size = out.tell()
+    out.seek(0)
+    return ExportResult(out, format, rows, size, (time.perf_counter() - start) * 1000, truncated)
@@ -0,0 +1,71 @@
+import io
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+from PIL import Image
+
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+@dataclass
+class DecodeStats:
+    source_size: tuple
+    decoded_size: tuple
+    reduction: int
+    elapsed_ms: float
+    estimated_peak_bytes: int
+
+    @property
+    def scale(self):
+        """Decoded width relative to the source; multiply source coordinates by this to get decoded ones."""
+        return self.decoded_size[0] / self.source_size[0]
+
+
+def image_size(data):
+    """Width, height and format from the header only."""
+    with Image.open(io.BytesIO(data)) as im:
+        return im.size, im.format
+
+
+def reduction_for(size, min_width=None, min_side=None):
+    """Largest 1/2, 1/4 or 1/8 reduction that keeps the image at least ``min_width`` wide / ``min_side`` long."""
+    w, h = size
+    for factor in (8, 4, 2):
+        if (min_width or min_side) and (not min_width or w // factor >= min_width) \
+                and (not min_side or max(w, h) // factor >= min_side):
+            return factor
+    return 1
+
+
+def decode_image(data, min_width=None, min_side=None):
+    """Decode upload bytes to an RGB array, only as large as the consumer needs.
+
+    Uses OpenCV's ``IMREAD_REDUCED_*`` modes, which for JPEG scale down in
+    the DCT and never materialise the full-size image. With neither limit
+    the full image is returned. The BGR to RGB swap happens in place, so
+    ``estimated_peak_bytes`` counts the single output buffer, plus the
+    full-size intermediate for non-JPEG formats that OpenCV decodes before
+    reducing. It is worked out from the sizes, not measured: OpenCV's
+    internal buffers are invisible to ``tracemalloc``.
+    """
+    start = time.perf_counter()
+    size, fmt = image_size(data)
+    factor = reduction_for(size, min_width, min_side)
+    flags = _REDUCED_FLAGS[factor] | cv2.IMREAD_IGNORE_ORIENTATION
+    array = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+    if array is None:
+        raise ValueError("Unsupported or corrupt image")
+    cv2.cvtColor(array, cv2.COLOR_BGR2RGB, dst=array)
+    peak = array.nbytes
+    if factor > 1 and fmt != "JPEG":
+        peak += size[0] * size[1] * 3
+    return array, DecodeStats(
+        size, (array.shape[1], array.shape[0]), factor, (time.perf_counter() - start) * 1000, peak
+    )
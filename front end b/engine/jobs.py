@@ -0,0 +1,340 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+
+from .detector import source_label
+from .metrics import StageTimings, registry, span
+from .pipeline import STAGES
+from .render import render_preview
+from .service import get_inference_service
+from .store import get_store
+from .tracking import Tracker
+from .video import BATCH_SIZE, VideoSummary, analyze_video, video_info
+
+JOB_WORKERS = int(os.environ.get("PV_JOB_WORKERS", "1"))
+JOB_DIR = os.environ.get(
+    "PV_JOB_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "jobs"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    panel_id TEXT NOT NULL,
+    source TEXT,
+    path TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    class_ids TEXT,
+    inspection_id INTEGER,
+    total_frames INTEGER NOT NULL DEFAULT 0,
+    frames_processed INTEGER NOT NULL DEFAULT 0,
+    frames_with_defects INTEGER NOT NULL DEFAULT 0,
+    defects INTEGER NOT NULL DEFAULT 0,
+    high_severity INTEGER NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    elapsed REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    created REAL NOT NULL,
+    finished REAL,
+    novelty_threshold REAL NOT NULL DEFAULT 0,
+    frames_reused INTEGER NOT NULL DEFAULT 0,
+    keyframe_interval INTEGER NOT NULL DEFAULT 1,
+    tracked_defects INTEGER NOT NULL DEFAULT 0,
+    tracked_high_severity INTEGER NOT NULL DEFAULT 0,
+    precision TEXT NOT NULL DEFAULT 'fp32'
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+"""
+
+# Columns added after the table was first created, for job tables from earlier versions.
+ADDED_COLUMNS = {
+    "novelty_threshold": "REAL NOT NULL DEFAULT 0",
+    "frames_reused": "INTEGER NOT NULL DEFAULT 0",
+    "keyframe_interval": "INTEGER NOT NULL DEFAULT 1",
+    "tracked_defects": "INTEGER NOT NULL DEFAULT 0",
+    "tracked_high_severity": "INTEGER NOT NULL DEFAULT 0",
+    "precision": "TEXT NOT NULL DEFAULT 'fp32'",
+}
+
+ACTIVE = ("queued", "running")
+PREVIEW_JOBS = 16
+
+
+@dataclass
+class Job:
+    """One row of the job table, with the same read-outs as ``VideoSummary``."""
+
+    id: int
+    kind: str
+    status: str
+    panel_id: str
+    source: str
+    path: str
+    confidence: float
+    class_ids: str
+    inspection_id: int
+    total_frames: int
+    frames_processed: int
+    frames_with_defects: int
+    defects: int
+    high_severity: int
+    confidence_sum: float
+    elapsed: float
+    error: str
+    created: float
+    finished: float
+    novelty_threshold: float
+    frames_reused: int
+    keyframe_interval: int
+    tracked_defects: int
+    tracked_high_severity: int
+    precision: str
+
+    @property
+    def active(self):
+        return self.status in ACTIVE
+
+    @property
+    def progress(self):
+        if self.status == "done":
+            return 1.0
+        return min(self.frames_processed / self.total_frames, 1.0) if self.total_frames else 0.0
+
+    @property
+    def avg_confidence(self):
+        return self.confidence_sum / self.defects if self.defects else 0.0
+
+    @property
+    def defect_frame_ratio(self):
+        return self.frames_with_defects / self.frames_processed if self.frames_processed else 0.0
+
+    @property
+    def fps(self):
+        return self.frames_processed / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def reuse_ratio(self):
+        return self.frames_reused / self.frames_processed if self.frames_processed else 0.0
+
+    @property
+    def selected_class_ids(self):
+        return None if self.class_ids is None else [int(i) for i in self.class_ids.split(",") if i]
+
+
+_COLUMNS = ", ".join(f.name for f in fields(Job))
+
+
+class JobQueue:
+    """Local queue that runs video analysis on a bounded worker pool, with state kept in the store's database.
+
+    Jobs outlive the session that submitted them: any session can list and
+    poll them, and progress counters and detections are written as each
+    batch of frames completes. ``workers`` caps concurrent jobs; inference
+    already spreads each forward pass over every core, so more than one or
+    two mostly adds contention. Jobs left ``queued`` by a previous process
+    are resubmitted on start; ones it left ``running`` are marked failed,
+    since their partial detections are already recorded.
+    """
+
+    def __init__(self, store=None, workers=JOB_WORKERS, job_dir=JOB_DIR):
+        self.store = store or get_store()
+        self.job_dir = job_dir
+        os.makedirs(job_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pv-job")
+        self._lock = threading.Lock()
+        self._cancelled = set()
+        self._previews = {}
+        self._timings = {}
+        with self.store.conn:
+            self.store.conn.executescript(SCHEMA)
+            existing = {row[1] for row in self.store.conn.execute("PRAGMA table_info(jobs)")}
+            for name, definition in ADDED_COLUMNS.items():
+                if name not in existing:
+                    self.store.conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+            interrupted = self.store.conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted by a restart', finished = ?"
+                " WHERE status = 'running' RETURNING path",
+                (time.time(),),
+            ).fetchall()
+        for (path,) in interrupted:
+            if os.path.exists(path):
+                os.remove(path)
+        for job in self.list(status="queued"):
+            if os.path.exists(job.path):
+                self._executor.submit(self._run, job.id)
+            else:
+                self._finish(job.id, "failed", "Uploaded video is no longer on disk")
+
+    def _update(self, job_id, **values):
+        with self._lock, self.store.conn:
+            self.store.conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in values)} WHERE id = ?",
+                (*values.values(), job_id),
+            )
+
+    def _finish(self, job_id, status, error=None):
+        self._update(job_id, status=status, error=error, finished=time.time())
+
+    def submit_video(self, upload, panel_id, source=None, confidence=0.5, class_ids=None, novelty_threshold=0.0,
+                     keyframe_interval=1, precision="fp32"):
+        """Copy ``upload`` to the job directory and queue it; returns the job id.
+
+        ``upload`` is a file-like object or the path of a file on disk, such
+        as a spooled upload, which is hard-linked when it shares a filesystem
+        with the job directory.
+
+        ``novelty_threshold`` and ``keyframe_interval`` are passed to
+        ``analyze_video``: inference runs on keyframes only and tracked boxes
+        fill the frames in between. ``precision`` picks the FP32 or INT8
+        inference service.
+        """
+        with self._lock, self.store.conn:
+            job_id = self.store.conn.execute(
+                "INSERT INTO jobs (kind, status, panel_id, source, path, confidence, class_ids, novelty_threshold,"
+                " keyframe_interval, precision, created) VALUES ('video', 'queued', ?, ?, '', ?, ?, ?, ?, ?, ?)",
+                (panel_id, source, confidence, None if class_ids is None else ",".join(map(str, class_ids)),
+                 novelty_threshold, keyframe_interval, precision, time.time()),
+            ).lastrowid
+        path = os.path.join(self.job_dir, f"{job_id}{os.path.splitext(source or '')[1]}")
+        if isinstance(upload, (str, os.PathLike)):
+            try:
+                os.link(upload, path)
+            except OSError:
+                shutil.copyfile(upload, path)
+        else:
+            with open(path, "wb") as out:
+                shutil.copyfileobj(upload, out, length=1 << 20)
+        self._update(job_id, path=path)
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id):
+        row = self.store.conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(*row) if row else None
+
+    def list(self, status=None, limit=20):
+        where, params = ("WHERE status = ?", (status,)) if status else ("", ())
+        rows = self.store.conn.execute(
+            f"SELECT {_COLUMNS} FROM jobs {where} ORDER BY id DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+        return [Job(*row) for row in rows]
+
+    def cancel(self, job_id):
+        self._cancelled.add(job_id)
+        with self._lock, self.store.conn:
+            self.store.conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+
+    def preview(self, job_id):
+        """``(frame_index, timestamp, jpeg)`` of the latest frame with defects, kept in memory for recent jobs only."""
+        return self._previews.get(job_id)
+
+    def timings(self, job_id):
+        """``StageTimings`` accumulated over the job so far, kept in memory for recent jobs only."""
+        return self._timings.get(job_id)
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return
+        try:
+            if job.status == "queued" and job_id not in self._cancelled:
+                self._analyze(job)
+        except Exception as exc:
+            self._finish(job_id, "failed", str(exc))
+        finally:
+            self._cancelled.discard(job_id)
+            if os.path.exists(job.path):
+                os.remove(job.path)
+
+    def _analyze(self, job):
+        detector = get_inference_service(job.precision)
+        summary = VideoSummary(total_frames=video_info(job.path)["frames"])
+        inspection_id = self.store.start_inspection(
+            job.panel_id, source_label(job.source, detector.fallback), media="video"
+        )
+        self._update(job.id, status="running", inspection_id=inspection_id, total_frames=summary.total_frames)
+        timings = StageTimings()
+        self._timings[job.id] = timings
+        while len(self._timings) > PREVIEW_JOBS:
+            self._timings.pop(next(iter(self._timings)))
+        pending_detections, pending_frames = [], 0
+        latest_defect_frame = None
+        tracker, recorded_tracks = Tracker(), set()
+
+        def flush():
+            if pending_frames:
+                self.store.add_frame_detections(inspection_id, pending_detections, pending_frames)
+            if latest_defect_frame is not None:
+                self._previews.pop(job.id, None)
+                with span(timings, STAGES[4]):
+                    jpeg = render_preview(latest_defect_frame.frame, latest_defect_frame.detections)
+                self._previews[job.id] = (latest_defect_frame.index, latest_defect_frame.timestamp, jpeg)
+                while len(self._previews) > PREVIEW_JOBS:
+                    self._previews.pop(next(iter(self._previews)))
+            self._update(
+                job.id,
+                frames_processed=summary.frames_processed,
+                frames_with_defects=summary.frames_with_defects,
+                frames_reused=summary.frames_reused,
+                tracked_defects=summary.tracked_defects,
+                tracked_high_severity=summary.tracked_high_severity,
+                defects=summary.defects,
+                high_severity=summary.high_severity,
+                confidence_sum=summary.confidence_sum,
+                elapsed=summary.elapsed,
+            )
+
+        def finish(status):
+            self._finish(job.id, status)
+            registry.observe(
+                timings, "video", items=summary.frames_processed, defects=summary.tracked_defects,
+                reused=summary.frames_reused, precision=job.precision,
+            )
+
+        for result in analyze_video(
+            job.path, detector, job.confidence, job.selected_class_ids, keep_frames=True, summary=summary,
+            timings=timings, novelty_threshold=job.novelty_threshold, keyframe_interval=job.keyframe_interval,
+            tracker=tracker,
+        ):
+            # Only keyframe detections are model output; boxes in between are the tracker's extrapolation.
+            if len(result.detections) and not result.reused:
+                latest_defect_frame = result
+                # One row per physical defect: its detection on the keyframe that confirmed the track.
+                new = [
+                    i for i, track_id in enumerate(result.track_ids.tolist())
+                    if track_id in tracker.confirmed and track_id not in recorded_tracks
+                ]
+                if new:
+                    recorded_tracks.update(result.track_ids[new].tolist())
+                    pending_detections.append((result.index, result.detections[new]))
+            pending_frames += 1
+            if summary.frames_processed % BATCH_SIZE == 0:
+                flush()
+                pending_detections, pending_frames, latest_defect_frame = [], 0, None
+                if job.id in self._cancelled:
+                    finish("cancelled")
+                    return
+        flush()
+        finish("done")
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide job queue; the first call resumes jobs left queued by a previous process."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
@@ -0,0 +1,224 @@
+import dataclasses
+import os
+import sys
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+SESSION_BUDGET = int(float(os.environ.get("PV_SESSION_MEMORY_MB", "256")) * 1024 * 1024)
+GLOBAL_BUDGET = int(float(os.environ.get("PV_MEMORY_BUDGET_MB", "2048")) * 1024 * 1024)
+
+
+def nbytes(value, _seen=None):
+    """Approximate bytes held by ``value``: array and buffer payloads, walked through containers and dataclasses."""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, memoryview, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(v, _seen) for v in value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(nbytes(v, _seen) for v in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sum(nbytes(getattr(value, f.name), _seen) for f in dataclasses.fields(value))
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ("value", "size", "pinned", "on_release")
+
+    def __init__(self, value, size, pinned, on_release):
+        self.value = value
+        self.size = size
+        self.pinned = pinned
+        self.on_release = on_release
+
+
+class MemoryManager:
+    """Byte accounting for what each browser session keeps alive, with per-session and global budgets.
+
+    Sessions keep uploads, previews and results here instead of directly in
+    ``st.session_state``. Entries share one least-recently-used order across
+    all sessions: storing an entry first evicts the session's own oldest
+    entries until it fits ``session_budget``, then the oldest entries of any
+    session until everything fits ``global_budget``. ``on_release(value)``
+    runs whenever an entry leaves, whether evicted, replaced or discarded,
+    so it can close files the value owns. Pinned entries (data the
+    session cannot give back, such as the upload widget's file) count against
+    both budgets but are never evicted, and the entry being stored is kept
+    even if it alone exceeds the session budget. An unpinned entry larger
+    than the whole global budget is refused instead of emptying every
+    session for it: nothing is evicted, it counts as evicted straight away,
+    and ``on_release`` is not called, so the caller's value stays usable for
+    the current run. Pages recompute an evicted entry when they next need
+    it, or ask the user to.
+    """
+
+    def __init__(self, session_budget=SESSION_BUDGET, global_budget=GLOBAL_BUDGET):
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._entries = OrderedDict()
+        self._session_bytes = {}
+        self._evicted = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def session(self):
+        """A new ``SessionMemory``; its entries are released once the handle is garbage-collected."""
+        return SessionMemory(self, uuid.uuid4().hex)
+
+    def get(self, session_id, key, default=None):
+        with self._lock:
+            entry = self._entries.get((session_id, key))
+            if entry is None:
+                return default
+            self._entries.move_to_end((session_id, key))
+            return entry.value
+
+    def put(self, session_id, key, value, size=None, pinned=False, on_release=None):
+        """Store ``value`` (measured with ``nbytes`` unless ``size`` is given) and evict to stay within budget."""
+        size = nbytes(value) if size is None else size
+        released = []
+        with self._lock:
+            self._remove(session_id, key, released, evicted=False, keep=value)
+            if size > self.global_budget and not pinned:
+                # Evicting everything else still wouldn't make it fit.
+                self.evictions += 1
+                self.evicted_bytes += size
+                self._evicted.setdefault(session_id, set()).add(key)
+            else:
+                self._entries[session_id, key] = _Entry(value, size, pinned, on_release)
+                self._session_bytes[session_id] = self._session_bytes.get(session_id, 0) + size
+                self._total += size
+                for owner, name in list(self._entries):
+                    if self._session_bytes[session_id] <= self.session_budget:
+                        break
+                    if owner == session_id and name != key and not self._entries[owner, name].pinned:
+                        self._remove(owner, name, released, evicted=True)
+                for owner, name in list(self._entries):
+                    if self._total <= self.global_budget:
+                        break
+                    if (owner, name) != (session_id, key) and not self._entries[owner, name].pinned:
+                        self._remove(owner, name, released, evicted=True)
+        # Callbacks run outside the lock: they may close files or call back into the manager.
+        for callback in released:
+            callback()
+        return value
+
+    def discard(self, session_id, key):
+        released = []
+        with self._lock:
+            self._remove(session_id, key, released, evicted=False)
+        for callback in released:
+            callback()
+
+    def _remove(self, session_id, key, released, evicted, keep=None):
+        entry = self._entries.pop((session_id, key), None)
+        if entry is None:
+            return
+        self._session_bytes[session_id] -= entry.size
+        self._total -= entry.size
+        if entry.on_release is not None and entry.value is not keep:
+            released.append(lambda: entry.on_release(entry.value))
+        if evicted:
+            self.evictions += 1
+            self.evicted_bytes += entry.size
+            self._evicted.setdefault(session_id, set()).add(key)
+        else:
+            self._evicted.get(session_id, set()).discard(key)
+
+    def was_evicted(self, session_id, key):
+        """True if ``key`` was last removed from the session by eviction, until it is stored or discarded again."""
+        with self._lock:
+            return key in self._evicted.get(session_id, ())
+
+    def release(self, session_id):
+        """Drop every entry of a session that has ended."""
+        released = []
+        with self._lock:
+            for owner, name in [k for k in self._entries if k[0] == session_id]:
+                self._remove(owner, name, released, evicted=False)
+            self._session_bytes.pop(session_id, None)
+            self._evicted.pop(session_id, None)
+        for callback in released:
+            callback()
+
+    def usage(self, session_id):
+        """``{"bytes", "budget", "entries": {key: bytes}}`` for one session."""
+        with self._lock:
+            return {
+                "bytes": self._session_bytes.get(session_id, 0),
+                "budget": self.session_budget,
+                "entries": {name: e.size for (owner, name), e in self._entries.items() if owner == session_id},
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "bytes": self._total,
+                "budget": self.global_budget,
+                "sessions": len(self._session_bytes),
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+            }
+
+
+class SessionMemory:
+    """One browser session's view of a ``MemoryManager``; keep it in ``st.session_state``.
+
+    When the session ends the handle is collected along with the rest of its
+    state and the manager releases everything the session held.
+    """
+
+    def __init__(self, manager, session_id):
+        self.manager = manager
+        self.session_id = session_id
+        self._finalizer = weakref.finalize(self, manager.release, session_id)
+
+    def get(self, key, default=None):
+        return self.manager.get(self.session_id, key, default)
+
+    def put(self, key, value, size=None, pinned=False, on_release=None):
+        return self.manager.put(self.session_id, key, value, size, pinned, on_release)
+
+    def discard(self, key):
+        self.manager.discard(self.session_id, key)
+
+    def was_evicted(self, key):
+        return self.manager.was_evicted(self.session_id, key)
+
+    def usage(self):
+        return self.manager.usage(self.session_id)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_memory_manager():
+    """Process-wide memory manager shared by all sessions."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = MemoryManager()
+    return _manager
+
+
+def session_memory(state, key="session_memory"):
+    """The ``SessionMemory`` kept in ``state`` (``st.session_state``), created on first use."""
+    memory = state.get(key)
+    if memory is None:
+        memory = state[key] = get_memory_manager().session()
+    return memory
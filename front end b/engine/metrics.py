@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_FILE = os.environ.get(
+    "PV_METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "metrics.prom"),
+)
+METRICS_PORT = int(os.environ.get("PV_METRICS_PORT", "0"))
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class StageTimings:
+    """Wall-clock seconds per pipeline stage for one analysis; a stage entered twice accumulates."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def merge(self, other):
+        for stage, seconds in other.stages.items():
+            self.add(stage, seconds)
+        return self
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+    def rows(self):
+        """``[{"Stage", "Time (ms)", "Share"}]`` for display."""
+        total = self.total or 1.0
+        return [
+            {"Stage": stage, "Time (ms)": round(seconds * 1000, 1), "Share": f"{seconds / total:.0%}"}
+            for stage, seconds in self.stages.items()
+        ]
+
+
+def span(timings, stage):
+    """``timings.span(stage)``, or a no-op context when ``timings`` is None."""
+    return nullcontext() if timings is None else timings.span(stage)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+def _labels(labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+
+class MetricsRegistry:
+    """Process-wide latency histograms and throughput counters in the Prometheus text format.
+
+    Every analysis feeds its ``StageTimings`` in once it finishes; the
+    registry keeps cumulative counts only, so memory does not grow with
+    traffic.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(Histogram)
+        self._counters = defaultdict(float)
+        self._gauges = {}
+
+    def observe(self, timings, media, items=1, defects=0, reused=0, precision="fp32"):
+        """Record one finished analysis of ``items`` images or frames, ``reused`` of which skipped inference.
+
+        Latencies are labelled with the model ``precision`` as well, so FP32
+        and INT8 can be compared on live traffic.
+        """
+        with self._lock:
+            for stage, seconds in timings.stages.items():
+                self._histograms[
+                    "pv_stage_duration_seconds", (("media", media), ("precision", precision), ("stage", stage))
+                ].observe(seconds)
+            self._histograms[
+                "pv_analysis_duration_seconds", (("media", media), ("precision", precision))
+            ].observe(timings.total)
+            self._counters["pv_analyses_total", (("media", media),)] += 1
+            self._counters["pv_items_processed_total", (("media", media),)] += items
+            self._counters["pv_defects_detected_total", (("media", media),)] += defects
+            self._counters["pv_inference_skipped_total", (("media", media),)] += reused
+        write_textfile()
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[name, tuple(sorted(labels.items()))] = value
+        write_textfile()
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for name in sorted({n for n, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (n, labels), hist in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(BUCKETS) + ["+Inf"], hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+            for kind, series in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted({n for n, _ in series}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    lines.extend(
+                        f"{name}{_labels(labels)} {value:g}" for (n, labels), value in sorted(series.items()) if n == name
+                    )
+            return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+_write_lock = threading.Lock()
+
+
+def write_textfile(path=METRICS_FILE):
+    """Atomically rewrite ``path`` for node_exporter's textfile collector; a no-op when set to an empty string."""
+    if not path:
+        return
+    with _write_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            f.write(registry.render())
+        os.replace(partial, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve ``/metrics`` on localhost:``port`` from a daemon thread, once per process; a no-op when ``port`` is 0."""
+    global _server
+    if not port or _server is not None:
+        return
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
@@ -0,0 +1,50 @@
+from contextlib import contextmanager
+
+from .metrics import span
+from .postprocess import DEFAULT_CONFIDENCE, postprocess
+
+STAGES = ["Preprocessing", "Inference", "Post-processing", "Classification", "Visualization"]
+# Timed alongside STAGES but not reported as progress: turning uploaded bytes or video into pixels.
+DECODING = "Decoding"
+
+
+def _report(on_stage, index):
+    if on_stage is not None:
+        on_stage(STAGES[index], index / len(STAGES))
+
+
+@contextmanager
+def _stage(on_stage, timings, index):
+    _report(on_stage, index)
+    with span(timings, STAGES[index]):
+        yield
+
+
+def detect_candidates(image, detector, on_stage=None, timings=None):
+    """Preprocess and infer one RGB array, returning every raw candidate before filtering.
+
+    Pass a ``StageTimings`` to have each stage's wall time added to it.
+    """
+    with _stage(on_stage, timings, 0):
+        batch, meta = detector.preprocess([image])
+    with _stage(on_stage, timings, 1):
+        return detector.decode(detector.infer(batch), meta)[0]
+
+
+def finalize(candidates, confidence=DEFAULT_CONFIDENCE, class_ids=None, merge=False, on_stage=None, timings=None,
+             seams=None, max_records=None):
+    """Post-process raw candidates into final detections and display records.
+
+    Visualization is left to the caller; ``on_stage`` receives it last so a
+    progress bar can be advanced before drawing, and the caller times it.
+    ``merge`` and ``seams`` are passed to ``postprocess``. Detections come
+    back highest score first; ``max_records`` limits the records to the top
+    ones, for display.
+    """
+    with _stage(on_stage, timings, 2):
+        dets = postprocess(candidates, confidence, class_ids, merge=merge, seams=seams)
+    with _stage(on_stage, timings, 3):
+        records = dets[:max_records].to_records()
+    _report(on_stage, 4)
+    return dets, records
+
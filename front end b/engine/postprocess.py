@@ -0,0 +1,179 @@
+import numpy as np
+
+from .detector import CLASS_NAMES, Detections
+
+DEFAULT_CONFIDENCE = 0.25
+NMS_IOU = 0.45
+MERGE_IOS = 0.5
+# Above this many x-overlapping pairs per box the sweep's pair list costs more
+# than suppressing against each kept box directly, unless the list fits in
+# MAX_PAIRS: the direct pass loops once per kept box, slow when most survive.
+DENSE_PAIRS_PER_BOX = 32
+# Pair lists up to this long (~100 MB of pair arrays) are always affordable;
+# fragment merging is skipped beyond it.
+MAX_PAIRS = 2_000_000
+
+
+def class_ids_for(names):
+    return np.array([CLASS_NAMES.index(n) for n in names if n in CLASS_NAMES], dtype=np.int32)
+
+
+def candidate_mask(dets, confidence=DEFAULT_CONFIDENCE, class_ids=None):
+    mask = dets.scores >= confidence
+    if class_ids is not None:
+        mask &= np.isin(dets.class_ids, class_ids)
+    return mask
+
+
+def _sweep(boxes):
+    """x-sorted order of ``boxes`` and, per sorted box, how many later boxes start before it ends."""
+    order = np.argsort(boxes[:, 0], kind="stable")
+    sorted_boxes = boxes[order]
+    ends = np.searchsorted(sorted_boxes[:, 0], sorted_boxes[:, 2], side="left")
+    return order, sorted_boxes, np.maximum(ends - np.arange(len(boxes)) - 1, 0)
+
+
+def _sweep_pairs(boxes, sweep):
+    """Every pair of sorted positions whose x-ranges overlap, with their intersections and both areas."""
+    order, sorted_boxes, counts = sweep
+    first = np.repeat(np.arange(len(boxes)), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    a, b = sorted_boxes[first], sorted_boxes[second]
+    w = np.clip(np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]), 0, None)
+    h = np.clip(np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]), 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return first, second, w * h, area_a, area_b
+
+
+def _overlapping_pairs(boxes, iou, sweep=None):
+    """All index pairs whose IoU exceeds ``iou``, found with an x-sorted sweep instead of an N x N matrix."""
+    sweep = sweep or _sweep(boxes)
+    first, second, inter, area_a, area_b = _sweep_pairs(boxes, sweep)
+    hit = inter / np.maximum(area_a + area_b - inter, 1e-6) > iou
+    return sweep[0][first[hit]], sweep[0][second[hit]]
+
+
+def _nms_dense(boxes, order, iou):
+    """Greedy NMS that suppresses against each kept box in turn; O(kept x N), for heavily overlapping sets."""
+    boxes = boxes[order]
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    alive = np.ones(len(order), dtype=bool)
+    keep = []
+    for r in range(len(order)):
+        if not alive[r]:
+            continue
+        keep.append(r)
+        rest = boxes[r + 1:]
+        w = np.clip(np.minimum(rest[:, 2], boxes[r, 2]) - np.maximum(rest[:, 0], boxes[r, 0]), 0, None)
+        h = np.clip(np.minimum(rest[:, 3], boxes[r, 3]) - np.maximum(rest[:, 1], boxes[r, 1]), 0, None)
+        inter = w * h
+        alive[r + 1:] &= inter / np.maximum(area[r + 1:] + area[r] - inter, 1e-6) <= iou
+    return order[keep]
+
+
+def nms(boxes, scores, class_ids, iou=NMS_IOU):
+    """Per-class greedy NMS in a single pass; returns kept indices sorted by descending score.
+
+    Boxes are offset by class so different classes never overlap. Overlapping
+    pairs are computed in one vectorized sweep; the greedy pass then only
+    walks that sparse suppression graph. When nearly everything overlaps
+    (thousands of raw candidates on one large defect) the pair list would be
+    quadratic, so suppression runs against each kept box instead.
+    """
+    if not len(scores):
+        return np.zeros(0, dtype=np.int64)
+    offset = class_ids.astype(np.float32)[:, None] * (boxes.max() + 1)
+    order = np.argsort(-scores, kind="stable")
+    shifted = boxes + offset
+    sweep = _sweep(shifted)
+    pairs = sweep[2].sum()
+    if pairs > DENSE_PAIRS_PER_BOX * len(order) and pairs > MAX_PAIRS:
+        return _nms_dense(shifted, order, iou)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    a, b = _overlapping_pairs(shifted, iou, sweep)
+    ra, rb = rank[a], rank[b]
+    winner, loser = np.minimum(ra, rb), np.maximum(ra, rb)
+    by_winner = np.argsort(winner, kind="stable")
+    losers = loser[by_winner]
+    bounds = np.searchsorted(winner[by_winner], np.arange(len(order) + 1))
+
+    suppressed = np.zeros(len(order), dtype=bool)
+    keep = []
+    for r in range(len(order)):
+        if suppressed[r]:
+            continue
+        keep.append(r)
+        suppressed[losers[bounds[r]:bounds[r + 1]]] = True
+    return order[keep]
+
+
+def _on_seam(boxes, seams):
+    """Boxes that cross or touch one of the ``(x_cuts, y_cuts)`` seam lines."""
+    hit = np.zeros(len(boxes), dtype=bool)
+    for axis, cuts in enumerate(seams):
+        cuts = np.asarray(cuts, dtype=np.float32)
+        if not len(cuts):
+            continue
+        nearest = np.minimum(np.searchsorted(cuts, boxes[:, axis]), len(cuts) - 1)
+        hit |= (cuts[nearest] >= boxes[:, axis]) & (cuts[nearest] <= boxes[:, axis + 2])
+    return hit
+
+
+def merge_fragments(dets, ios=MERGE_IOS, seams=None):
+    """Fuse same-class boxes where one mostly lies inside the other, e.g. a crack cut in two by a tile seam.
+
+    With ``seams`` (``tiling.tile_seams``) only boxes crossing or touching a
+    seam are considered, since nothing else was cut. Candidate pairs come from
+    the same x-sorted sweep as ``nms``, never an N x N matrix; past
+    ``MAX_PAIRS`` of them the boxes are returned unmerged.
+    """
+    if len(dets) < 2:
+        return dets
+    boxes, scores, class_ids = dets.boxes, dets.scores, dets.class_ids
+    idx = np.arange(len(dets)) if seams is None else np.flatnonzero(_on_seam(boxes, seams))
+    if len(idx) < 2:
+        return dets
+    shifted = boxes[idx] + class_ids[idx].astype(np.float32)[:, None] * (boxes.max() + 1)
+    sweep = _sweep(shifted)
+    if sweep[2].sum() > MAX_PAIRS:
+        return dets
+    first, second, inter, area_a, area_b = _sweep_pairs(shifted, sweep)
+    hit = inter / np.maximum(np.minimum(area_a, area_b), 1e-6) >= ios
+    a, b = idx[sweep[0][first[hit]]], idx[sweep[0][second[hit]]]
+    if not len(a):
+        return dets
+
+    # Neighbour lists in both directions, then the greedy pass: each box, by
+    # descending score, absorbs its neighbours that are still unclaimed.
+    src, dst = np.concatenate([a, b]), np.concatenate([b, a])
+    by_src = np.argsort(src, kind="stable")
+    dst = dst[by_src]
+    bounds = np.searchsorted(src[by_src], np.arange(len(dets) + 1))
+    merged = boxes.copy()
+    absorbed = np.zeros(len(dets), dtype=bool)
+    linked = np.unique(src)
+    for i in linked[np.argsort(-scores[linked], kind="stable")]:
+        if absorbed[i]:
+            continue
+        group = dst[bounds[i]:bounds[i + 1]]
+        group = group[~absorbed[group]]
+        absorbed[group] = True
+        members = np.append(group, i)
+        merged[i] = np.concatenate([boxes[members, :2].min(axis=0), boxes[members, 2:].max(axis=0)])
+    keep = np.flatnonzero(~absorbed)
+    keep = keep[np.argsort(-scores[keep], kind="stable")]
+    return Detections(merged[keep], scores[keep], class_ids[keep])
+
+
+def postprocess(dets, confidence=DEFAULT_CONFIDENCE, class_ids=None, iou=NMS_IOU, merge=False, seams=None):
+    """Confidence filter, defect-type mask and per-class NMS over raw candidates.
+
+    ``merge`` additionally fuses fragments split across tile seams; pass the
+    tiling's ``seams`` to limit it to the boxes on them.
+    """
+    dets = dets[candidate_mask(dets, confidence, class_ids)]
+    dets = dets[nms(dets.boxes, dets.scores, dets.class_ids, iou)]
+    return merge_fragments(dets, seams=seams) if merge else dets
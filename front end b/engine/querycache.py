@@ -0,0 +1,61 @@
+import threading
+import time
+
+
+class QueryCache:
+    """Process-wide TTL cache for query results, invalidated when the store's write version moves.
+
+    Concurrent misses on the same key wait for a single loader instead of
+    each running the query. Beyond ``max_entries`` keys the oldest load is
+    dropped, which bounds parameterised keys such as chart windows.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _fresh(self, key, version, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry["version"] == version and entry["expires"] > now:
+            return entry
+        return None
+
+    def get(self, key, loader, ttl, version=None):
+        entry = self._fresh(key, version, time.monotonic())
+        if entry is None:
+            with self._key_lock(key):
+                entry = self._fresh(key, version, time.monotonic())
+                if entry is None:
+                    value = loader()
+                    now = time.monotonic()
+                    entry = {"value": value, "version": version, "expires": now + ttl, "loaded": time.time()}
+                    with self._lock:
+                        self._entries.pop(key, None)
+                        self._entries[key] = entry
+                        while len(self._entries) > self.max_entries:
+                            stale = next(iter(self._entries))
+                            self._entries.pop(stale)
+                            self._locks.pop(stale, None)
+                    self.misses += 1
+                    return value
+        self.hits += 1
+        return entry["value"]
+
+    def loaded_at(self, key):
+        entry = self._entries.get(key)
+        return entry["loaded"] if entry else None
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
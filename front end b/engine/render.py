@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+from .detector import CLASS_NAMES
+
+DISPLAY_WIDTH = 1280
+PREVIEW_QUALITY = 85
+FULL_QUALITY = 95
+
+# Past a few hundred boxes an annotated image is unreadable and drawing only costs time.
+MAX_DRAWN = 500
+
+SEVERITY_RGB = np.array([(231, 76, 60), (243, 156, 18), (39, 174, 96)], dtype=np.uint8)
+
+
+def fit_width(image, width=DISPLAY_WIDTH):
+    """Downscale an RGB array to at most ``width`` pixels wide; returns the array and the scale applied."""
+    h, w = image.shape[:2]
+    if w <= width:
+        return image, 1.0
+    scale = width / w
+    return cv2.resize(image, (width, max(1, round(h * scale))), interpolation=cv2.INTER_AREA), scale
+
+
+def draw_detections(image, dets, scale=1.0, labels=True, limit=MAX_DRAWN):
+    """Draw the ``limit`` highest-scoring boxes onto a copy of ``image``, scaling them from source pixels by ``scale``."""
+    canvas = np.ascontiguousarray(image).copy()
+    if not len(dets):
+        return canvas
+    if len(dets) > limit:
+        dets = dets[np.argsort(-dets.scores, kind="stable")[:limit]]
+    thickness = max(2, round(canvas.shape[1] / 640))
+    font_scale = max(0.5, canvas.shape[1] / 2560)
+    boxes = np.round(dets.boxes * scale).astype(np.int32).tolist()
+    colors = SEVERITY_RGB[dets.severity_ids].tolist()
+    for (x1, y1, x2, y2), color, class_id, score in zip(boxes, colors, dets.class_ids.tolist(), dets.scores.tolist()):
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), color, thickness)
+        if labels:
+            cv2.putText(canvas, f"{CLASS_NAMES[class_id]} ({score:.2f})", (x1, max(y1 - 2 * thickness, 12)),
+                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, max(1, thickness // 2), cv2.LINE_AA)
+    return canvas
+
+
+def encode_jpeg(image, quality=PREVIEW_QUALITY):
+    ok, buf = cv2.imencode(".jpg", cv2.cvtColor(image, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buf.tobytes()
+
+
+def render_preview(image, dets, width=DISPLAY_WIDTH, quality=PREVIEW_QUALITY):
+    """Annotated, display-sized JPEG bytes for ``st.image``."""
+    small, scale = fit_width(image, width)
+    return encode_jpeg(draw_detections(small, dets, scale), quality)
+
+
+def render_full(image, dets, quality=FULL_QUALITY):
+    """Full-resolution annotated JPEG bytes, meant for downloads only."""
+    return encode_jpeg(draw_detections(image, dets), quality)
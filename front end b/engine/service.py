@@ -0,0 +1,159 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from .detector import PRECISION, Detector, get_detector
+from .video import BATCH_SIZE
+
+MAX_BATCH = int(os.environ.get("PV_MAX_BATCH", str(BATCH_SIZE)))
+MAX_WAIT_MS = float(os.environ.get("PV_BATCH_WAIT_MS", "10"))
+
+
+class _Request:
+    __slots__ = ("batch", "size", "future", "queued")
+
+    def __init__(self, batch, size):
+        self.batch = batch
+        self.size = size
+        self.future = Future()
+        self.queued = time.perf_counter()
+
+
+class BatchingDetector(Detector):
+    """Detector that funnels every caller's ``infer`` through one thread, merging concurrent calls into micro-batches.
+
+    Preprocessing and decoding stay on the calling thread; only the forward
+    pass is shared. The worker takes everything queued (requests pile up
+    while the previous pass runs) and, while another caller is still
+    preprocessing, waits up to ``max_wait_ms`` for it, stopping at
+    ``max_batch`` images. A lone caller therefore never waits. A request
+    that alone exceeds ``max_batch`` (a tiled image, say) runs on its own
+    and is never split.
+    """
+
+    def __init__(self, detector, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.detector = detector
+        self.name = detector.name
+        self.version = detector.version
+        self.precision = detector.precision
+        self.input_size = detector.input_size
+        self.fallback = detector.fallback
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._carry = None
+        self._preparing = 0
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._wait_total = 0.0
+        self._infer_total = 0.0
+        self._worker = threading.Thread(target=self._run, name="inference-service", daemon=True)
+        self._worker.start()
+
+    def preprocess(self, images):
+        with self._stats_lock:
+            self._preparing += 1
+        try:
+            return super().preprocess(images)
+        finally:
+            with self._stats_lock:
+                self._preparing -= 1
+
+    def prepare(self, image):
+        return self.detector.prepare(image)
+
+    def collate(self, inputs):
+        return self.detector.collate(inputs)
+
+    def concat_batches(self, batches):
+        return self.detector.concat_batches(batches)
+
+    def decode(self, raw, meta):
+        return self.detector.decode(raw, meta)
+
+    def infer(self, batch):
+        request = _Request(batch, len(batch))
+        self._queue.put(request)
+        return request.future.result()
+
+    def _collect(self):
+        first = self._carry or self._queue.get()
+        self._carry = None
+        requests, size = [first], first.size
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0 and self._preparing:
+                    request = self._queue.get(timeout=remaining)
+                else:
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if size + request.size > self.max_batch:
+                self._carry = request
+                break
+            requests.append(request)
+            size += request.size
+        return requests, size
+
+    def _run(self):
+        while True:
+            requests, size = self._collect()
+            start = time.perf_counter()
+            try:
+                raw = self.detector.infer(self.detector.concat_batches([r.batch for r in requests]))
+            except Exception as exc:
+                for request in requests:
+                    request.future.set_exception(exc)
+                continue
+            elapsed = time.perf_counter() - start
+            offset = 0
+            for request in requests:
+                request.future.set_result(raw[offset:offset + request.size])
+                offset += request.size
+            with self._stats_lock:
+                self._batch_sizes[size] += 1
+                self._requests += len(requests)
+                self._wait_total += sum(start - r.queued for r in requests)
+                self._infer_total += elapsed
+
+    def stats(self):
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            images = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "queue_depth": self._queue.qsize() + (self._carry is not None),
+                "preparing": self._preparing,
+                "requests": self._requests,
+                "batches": batches,
+                "images": images,
+                "mean_batch_size": images / batches if batches else 0.0,
+                "requests_per_batch": self._requests / batches if batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "mean_wait_ms": self._wait_total / self._requests * 1000 if self._requests else 0.0,
+                "mean_infer_ms": self._infer_total / batches * 1000 if batches else 0.0,
+            }
+
+
+_services = {}
+_service_lock = threading.Lock()
+
+
+def get_inference_service(precision=PRECISION):
+    """Process-wide micro-batching front for the shared ``precision`` detector, used by every session and background job."""
+    if precision not in _services:
+        with _service_lock:
+            if precision not in _services:
+                _services[precision] = BatchingDetector(get_detector(precision))
+    return _services[precision]
+
+
+def service_stats(precision=PRECISION):
+    """Stats of the shared ``precision`` service, or ``None`` if nothing has used it yet in this process."""
+    service = _services.get(precision)
+    return None if service is None else service.stats()
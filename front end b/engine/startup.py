@@ -0,0 +1,147 @@
+import argparse
+import glob
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PREFIX = "pv-startup "
+# What the Dashboard's first st.plotly_chart imports: about half a second of plotly.io and plotly.offline.
+DASHBOARD_MODULES = ("plotly.io", "plotly.tools")
+# Set in profiled children so background imports don't land in the page's timings.
+NO_PRELOAD = bool(os.environ.get("PV_NO_PRELOAD"))
+
+reports = []
+_reported = set()
+_lock = threading.Lock()
+_preloaded = set()
+
+
+class PageProfile:
+    """Times a page's imports and its first full run in this process.
+
+    Pass ``started``, taken with ``time.perf_counter()`` before the page's
+    first ``engine`` import, since importing this module already loads the
+    ``engine`` package. Call ``imported()`` after the page's other imports and
+    ``rendered()`` once everything has been drawn. Only the first run of each
+    page per process is reported, since later reruns find every module
+    already loaded: one ``pv-startup`` JSON line on stderr, an entry in
+    ``reports`` and ``pv_page_*_seconds`` gauges in the metrics export.
+    """
+
+    def __init__(self, page, started=None):
+        self.page = page
+        self.started = time.perf_counter() if started is None else started
+        self.imports = None
+
+    def imported(self):
+        self.imports = time.perf_counter() - self.started
+
+    def rendered(self):
+        if self.page in _reported:
+            return
+        with _lock:
+            if self.page in _reported:
+                return
+            _reported.add(self.page)
+        render = time.perf_counter() - self.started
+        report = {
+            "page": self.page,
+            "import_ms": round((self.imports or 0.0) * 1000, 1),
+            "render_ms": round(render * 1000, 1),
+        }
+        reports.append(report)
+        print(REPORT_PREFIX + json.dumps(report), file=sys.stderr, flush=True)
+        from .metrics import registry
+
+        registry.set_gauge("pv_page_import_seconds", self.imports or 0.0, page=self.page)
+        registry.set_gauge("pv_page_first_render_seconds", render, page=self.page)
+
+
+def preload_modules(names=DASHBOARD_MODULES):
+    """Import ``names`` on a background thread, once per process, so the page that needs them doesn't pay for it."""
+    if NO_PRELOAD:
+        return
+    with _lock:
+        names = [name for name in names if name not in _preloaded and name not in sys.modules]
+        _preloaded.update(names)
+    if names:
+        threading.Thread(
+            target=lambda: [importlib.import_module(name) for name in names], name="module-preload", daemon=True
+        ).start()
+
+
+# Run in a fresh interpreter per page: AppTest is imported (and with it
+# Streamlit, as the server would have) before the marker, so the import times
+# after it are the page's own. Results go to stdout, apart from the
+# ``-X importtime`` lines other threads may still write to stderr.
+_CHILD = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+print("pv-startup-marker", file=sys.stderr, flush=True)
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+print("pv-startup-total %.1f %d" % ((time.perf_counter() - start) * 1000, len(at.exception)))
+for report in getattr(sys.modules.get("engine.startup"), "reports", ()):
+    print("pv-startup " + json.dumps(report))
+"""
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+_TOTAL_LINE = re.compile(r"pv-startup-total (\S+) (\d+)$")
+
+
+def profile_page(path, top=10):
+    """Cold-start ``path`` in a new process and return its timings and slowest top-level imports."""
+    env = dict(os.environ, PV_METRICS_FILE="", PV_METRICS_PORT="0", PV_NO_PRELOAD="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, path],
+        cwd=APP_DIR, env=env, capture_output=True, text=True,
+    )
+    result = {"script": os.path.relpath(path, APP_DIR), "imports": []}
+    for line in proc.stdout.splitlines():
+        if match := _TOTAL_LINE.match(line):
+            result["run_ms"] = float(match.group(1))
+            result["exceptions"] = int(match.group(2))
+        elif line.startswith(REPORT_PREFIX):
+            result.update(json.loads(line[len(REPORT_PREFIX):]))
+    after_marker = False
+    for line in proc.stderr.splitlines():
+        if line == "pv-startup-marker":
+            after_marker = True
+        elif after_marker and (match := _IMPORT_LINE.match(line)) and len(match.group(3)) == 1:
+            result["imports"].append((match.group(4), int(match.group(2)) / 1000))
+    if "run_ms" not in result:
+        raise RuntimeError(f"{path} did not run:\n{proc.stderr[-2000:]}")
+    result["imports"] = sorted(result["imports"], key=lambda item: -item[1])[:top]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.startup",
+        description="Cold-start each page in a fresh process and report import and first-render time.",
+    )
+    parser.add_argument(
+        "pages", nargs="*",
+        default=[os.path.join(APP_DIR, "Home.py"), *sorted(glob.glob(os.path.join(APP_DIR, "pages", "*.py")))],
+        help="Page scripts to profile (default: every page)",
+    )
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports to list per page (default: 5)")
+    args = parser.parse_args(argv)
+
+    for path in args.pages:
+        result = profile_page(os.path.abspath(path), args.top)
+        imports = f"{result['import_ms']:.0f} ms" if "import_ms" in result else "n/a"
+        print(f"{result['script']:<24} imports {imports:>8} · first run {result['run_ms']:.0f} ms"
+              + (f" · {result['exceptions']} exception(s)" if result["exceptions"] else ""))
+        for name, ms in result["imports"]:
+            print(f"    {ms:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .detector import CLASS_NAMES, CLASS_SEVERITY, SEVERITIES, Detections
+
+STORE_PATH = os.environ.get(
+    "PV_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "detections.db"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inspections (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    panel_id TEXT NOT NULL,
+    source TEXT,
+    media TEXT NOT NULL,
+    frames INTEGER NOT NULL DEFAULT 1,
+    defects INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    inspection_id INTEGER NOT NULL REFERENCES inspections(id),
+    ts REAL NOT NULL,
+    panel_id TEXT NOT NULL,
+    defect_type INTEGER NOT NULL,
+    severity INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    frame INTEGER,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL
+);
+CREATE INDEX IF NOT EXISTS idx_inspections_ts ON inspections(ts);
+CREATE INDEX IF NOT EXISTS idx_inspections_panel ON inspections(panel_id);
+CREATE INDEX IF NOT EXISTS idx_detections_ts ON detections(ts);
+CREATE INDEX IF NOT EXISTS idx_detections_panel ON detections(panel_id, ts);
+CREATE INDEX IF NOT EXISTS idx_detections_type ON detections(defect_type, ts);
+CREATE INDEX IF NOT EXISTS idx_detections_severity ON detections(severity, ts);
+CREATE INDEX IF NOT EXISTS idx_detections_inspection ON detections(inspection_id);
+
+CREATE TABLE IF NOT EXISTS rollup_daily (
+    day INTEGER NOT NULL,
+    defect_type INTEGER NOT NULL,
+    severity INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    PRIMARY KEY (day, defect_type, severity)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_minute (
+    minute INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_totals (
+    defect_type INTEGER NOT NULL,
+    severity INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (defect_type, severity)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_panels (
+    panel_id TEXT PRIMARY KEY,
+    inspections INTEGER NOT NULL,
+    defects INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+DAY = 86400
+MINUTE = 60
+
+
+@dataclass(frozen=True)
+class HistoryFilter:
+    """Server-side filter for the detection history; ``None`` / empty means unfiltered.
+
+    ``start`` and ``end`` are epoch seconds (end exclusive); ``defect_types``
+    and ``severities`` are index tuples into ``CLASS_NAMES`` / ``SEVERITIES``.
+    """
+
+    start: float = None
+    end: float = None
+    panel_id: str = None
+    defect_types: tuple = ()
+    severities: tuple = ()
+    min_confidence: float = 0.0
+
+    def where(self):
+        clauses, params = [], []
+        if self.start is not None:
+            clauses.append("ts >= ?")
+            params.append(self.start)
+        if self.end is not None:
+            clauses.append("ts < ?")
+            params.append(self.end)
+        if self.panel_id:
+            clauses.append("panel_id = ?")
+            params.append(self.panel_id)
+        # A filter that admits every value is dropped so the planner can walk the ts index.
+        if self.defect_types and len(set(self.defect_types)) < len(CLASS_NAMES):
+            clauses.append(f"defect_type IN ({', '.join('?' * len(self.defect_types))})")
+            params.extend(self.defect_types)
+        if self.severities and len(set(self.severities)) < len(SEVERITIES):
+            clauses.append(f"severity IN ({', '.join('?' * len(self.severities))})")
+            params.extend(self.severities)
+        if self.min_confidence:
+            clauses.append("confidence >= ?")
+            params.append(self.min_confidence)
+        return clauses, params
+
+
+class DetectionStore:
+    """SQLite (WAL) store of inspections and their detections.
+
+    Each thread gets its own connection; WAL lets dashboard readers run
+    alongside the single writer.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock:
+            self.conn.executescript(SCHEMA)
+            if self._rollups_missing():
+                self._rebuild_rollups()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+        return conn
+
+    def start_inspection(self, panel_id, source=None, media="image", ts=None):
+        with self._write_lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO inspections (ts, panel_id, source, media, frames, defects) VALUES (?, ?, ?, ?, 0, 0)",
+                (ts if ts is not None else time.time(), panel_id, source, media),
+            )
+            new_panel = self.conn.execute(
+                "INSERT INTO rollup_panels (panel_id, inspections, defects) VALUES (?, 1, 0)"
+                " ON CONFLICT(panel_id) DO UPDATE SET inspections = inspections + 1 RETURNING inspections = 1",
+                (panel_id,),
+            ).fetchone()[0]
+            if new_panel:
+                self._bump("panels", 1)
+            self._bump("writes", 1)
+        return cur.lastrowid
+
+    def add_detections(self, inspection_id, dets, frame=None, frames=1, ts=None):
+        """Bulk-insert one image's or frame batch's detections and bump the inspection's counters."""
+        ts = ts if ts is not None else time.time()
+        with self._write_lock, self.conn:
+            panel_id = self.conn.execute(
+                "SELECT panel_id FROM inspections WHERE id = ?", (inspection_id,)
+            ).fetchone()[0]
+            self._insert(inspection_id, panel_id, ts, dets, frame)
+            self._update_rollups(panel_id, ts, dets)
+            self.conn.execute(
+                "UPDATE inspections SET frames = frames + ?, defects = defects + ? WHERE id = ?",
+                (frames, len(dets), inspection_id),
+            )
+            # Frame counts alone don't change anything the Dashboard reads; a clean batch keeps its caches.
+            if len(dets):
+                self._bump("writes", 1)
+
+    def add_frame_detections(self, inspection_id, frame_detections, frames):
+        """Insert a batch of video frames given as ``[(frame_index, Detections)]``."""
+        frame_index = np.concatenate([np.full(len(d), i) for i, d in frame_detections] or [np.zeros(0, int)])
+        self.add_detections(
+            inspection_id, Detections.concat(d for _, d in frame_detections), frame=frame_index, frames=frames
+        )
+
+    def record_inspection(self, panel_id, dets, source=None, media="image", ts=None):
+        inspection_id = self.start_inspection(panel_id, source, media, ts)
+        self.add_detections(inspection_id, dets, ts=ts)
+        return inspection_id
+
+    def _insert(self, inspection_id, panel_id, ts, dets, frame):
+        if not len(dets):
+            return
+        n = len(dets)
+        frames = frame if isinstance(frame, np.ndarray) else np.full(n, -1 if frame is None else frame)
+        rows = zip(
+            [inspection_id] * n,
+            [ts] * n,
+            [panel_id] * n,
+            dets.class_ids.tolist(),
+            CLASS_SEVERITY[dets.class_ids].tolist(),
+            dets.scores.tolist(),
+            [None if f < 0 else f for f in frames.tolist()],
+            *dets.boxes.T.tolist(),
+        )
+        self.conn.executemany(
+            "INSERT INTO detections (inspection_id, ts, panel_id, defect_type, severity, confidence, frame,"
+            " x1, y1, x2, y2) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _bump(self, name, delta):
+        self.conn.execute(
+            "INSERT INTO rollup_counters (name, value) VALUES (?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, delta),
+        )
+
+    def _update_rollups(self, panel_id, ts, dets):
+        """Fold one insert batch into the pre-aggregated tables inside the caller's transaction."""
+        if not len(dets):
+            return
+        day = int(ts // DAY)
+        keys, inverse = np.unique(
+            np.stack([dets.class_ids, CLASS_SEVERITY[dets.class_ids]], axis=1), axis=0, return_inverse=True
+        )
+        inverse = inverse.ravel()
+        counts = np.bincount(inverse, minlength=len(keys)).tolist()
+        confidence = np.bincount(inverse, weights=dets.scores, minlength=len(keys)).tolist()
+        groups = [(int(t), int(v), n, c) for (t, v), n, c in zip(keys.tolist(), counts, confidence)]
+        self.conn.executemany(
+            "INSERT INTO rollup_daily (day, defect_type, severity, count, confidence_sum) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(day, defect_type, severity) DO UPDATE SET"
+            " count = count + excluded.count, confidence_sum = confidence_sum + excluded.confidence_sum",
+            [(day, t, v, n, c) for t, v, n, c in groups],
+        )
+        self.conn.execute(
+            "INSERT INTO rollup_minute (minute, count) VALUES (?, ?)"
+            " ON CONFLICT(minute) DO UPDATE SET count = count + excluded.count",
+            (int(ts // MINUTE), len(dets)),
+        )
+        self.conn.executemany(
+            "INSERT INTO rollup_totals (defect_type, severity, count) VALUES (?, ?, ?)"
+            " ON CONFLICT(defect_type, severity) DO UPDATE SET count = count + excluded.count",
+            [(t, v, n) for t, v, n, _ in groups],
+        )
+        first_defects = self.conn.execute(
+            "UPDATE rollup_panels SET defects = defects + ? WHERE panel_id = ? RETURNING defects = ?",
+            (len(dets), panel_id, len(dets)),
+        ).fetchone()
+        if first_defects and first_defects[0]:
+            self._bump("panels_with_defects", 1)
+
+    def _rollups_missing(self):
+        has_rollups = self.conn.execute("SELECT 1 FROM rollup_counters LIMIT 1").fetchone()
+        has_data = self.conn.execute("SELECT 1 FROM inspections LIMIT 1").fetchone()
+        has_minutes = self.conn.execute("SELECT 1 FROM rollup_minute LIMIT 1").fetchone()
+        has_detections = self.conn.execute("SELECT 1 FROM detections LIMIT 1").fetchone()
+        return (has_data is not None and has_rollups is None) or (has_detections is not None and has_minutes is None)
+
+    def _rebuild_rollups(self):
+        """Recompute every rollup from the raw tables, e.g. for a database written before rollups existed."""
+        with self.conn:
+            for table in ("rollup_daily", "rollup_minute", "rollup_totals", "rollup_panels", "rollup_counters"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.execute(
+                "INSERT INTO rollup_daily SELECT CAST(ts / 86400 AS INTEGER), defect_type, severity,"
+                " COUNT(*), SUM(confidence) FROM detections GROUP BY 1, 2, 3"
+            )
+            self.conn.execute(
+                "INSERT INTO rollup_minute SELECT CAST(ts / 60 AS INTEGER), COUNT(*) FROM detections GROUP BY 1"
+            )
+            self.conn.execute(
+                "INSERT INTO rollup_totals SELECT defect_type, severity, COUNT(*) FROM detections GROUP BY 1, 2"
+            )
+            self.conn.execute(
+                "INSERT INTO rollup_panels SELECT panel_id, COUNT(*), SUM(defects) FROM inspections GROUP BY 1"
+            )
+            self.conn.execute(
+                "INSERT INTO rollup_counters SELECT 'panels', COUNT(*) FROM rollup_panels"
+                " UNION ALL SELECT 'panels_with_defects', COUNT(*) FROM rollup_panels WHERE defects > 0"
+                " UNION ALL SELECT 'writes', COUNT(*) FROM inspections"
+            )
+
+    def recorded_sources(self, media=None):
+        """Every distinct inspection ``source`` recorded so far, optionally for one media type."""
+        where, params = ("WHERE media = ?", (media,)) if media else ("", ())
+        return {row[0] for row in self.conn.execute(f"SELECT DISTINCT source FROM inspections {where}", params)}
+
+    def write_version(self):
+        """Counter bumped by every write that changes the Dashboard's data, from any process; cheap enough to poll per page run."""
+        row = self.conn.execute("SELECT value FROM rollup_counters WHERE name = 'writes'").fetchone()
+        return row[0] if row else 0
+
+    def totals(self):
+        counters = dict(self.conn.execute("SELECT name, value FROM rollup_counters"))
+        defects = self.conn.execute("SELECT COALESCE(SUM(count), 0) FROM rollup_totals").fetchone()[0]
+        panels = counters.get("panels", 0)
+        return {
+            "defects": defects,
+            "panels": panels,
+            "defect_rate": counters.get("panels_with_defects", 0) / panels if panels else 0.0,
+        }
+
+    def counts_by_type(self):
+        rows = dict(self.conn.execute("SELECT defect_type, SUM(count) FROM rollup_totals GROUP BY defect_type"))
+        return {name: rows.get(i, 0) for i, name in enumerate(CLASS_NAMES)}
+
+    def counts_by_severity(self):
+        rows = dict(self.conn.execute("SELECT severity, SUM(count) FROM rollup_totals GROUP BY severity"))
+        return {name: rows.get(i, 0) for i, name in enumerate(SEVERITIES)}
+
+    def history_page(self, filters=None, limit=50, after=None, before=None):
+        """One page of detections, newest first, seeked by keyset rather than OFFSET.
+
+        ``after`` / ``before`` are ``(ts, id)`` keys of the last / first row of
+        a page already shown; pass one to get the next / previous page.
+        Returns ``(rows, more)`` where ``more`` says whether another page exists
+        in the direction of travel. Only ``limit + 1`` rows are read.
+        """
+        clauses, params = (filters or HistoryFilter()).where()
+        order = "DESC"
+        if after is not None:
+            clauses.append("(ts, id) < (?, ?)")
+            params.extend(after)
+        elif before is not None:
+            clauses.append("(ts, id) > (?, ?)")
+            params.extend(before)
+            order = "ASC"
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT id, ts, panel_id, defect_type, severity, confidence FROM detections {where}"
+            f" ORDER BY ts {order}, id {order} LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if order == "ASC":
+            rows.reverse()
+        return [
+            {
+                "id": row_id,
+                "ts": ts,
+                "panel_id": panel_id,
+                "defect_type": CLASS_NAMES[defect_type],
+                "severity": SEVERITIES[severity],
+                "confidence": confidence,
+            }
+            for row_id, ts, panel_id, defect_type, severity, confidence in rows
+        ], more
+
+    def binned_counts(self, start, end, bin_minutes, offset_minutes=0):
+        """``(bin_start_epochs, counts)`` arrays of detections per ``bin_minutes`` wide bin over ``start``..``end``.
+
+        Bins are aligned to the epoch shifted by ``offset_minutes`` and every
+        bin in the range is present, empty ones as zero. Whole-day bins on
+        day boundaries are served from the daily rollup, finer ones from the
+        per-minute rollup, so the cost follows the number of active days or
+        minutes in range, never the number of detections.
+        """
+        first = (int(start // MINUTE) + offset_minutes) // bin_minutes
+        last = (int(end // MINUTE) + offset_minutes) // bin_minutes
+        if bin_minutes % (DAY // MINUTE) == 0 and offset_minutes % (DAY // MINUTE) == 0:
+            per_day = DAY // MINUTE
+            rows = self.conn.execute(
+                "SELECT (day + ?) / ?, SUM(count) FROM rollup_daily WHERE day >= ? AND day <= ? GROUP BY 1",
+                (offset_minutes // per_day, bin_minutes // per_day, int(start // DAY), int(end // DAY)),
+            ).fetchall()
+        else:
+            rows = self.conn.execute(
+                "SELECT (minute + ?) / ?, SUM(count) FROM rollup_minute WHERE minute >= ? AND minute <= ? GROUP BY 1",
+                (offset_minutes, bin_minutes, int(start // MINUTE), int(end // MINUTE)),
+            ).fetchall()
+        counts = np.zeros(max(last - first + 1, 0), dtype=np.int64)
+        if rows:
+            bins, values = np.array(rows, dtype=np.int64).T
+            counts[bins - first] = values
+        edges = (np.arange(first, last + 1, dtype=np.int64) * bin_minutes - offset_minutes) * MINUTE
+        return edges, counts
+
+    def inspection_detections(self, inspection_id, limit=25):
+        """Latest detections of one inspection, newest frame first, for live partial results."""
+        rows = self.conn.execute(
+            "SELECT frame, defect_type, severity, confidence FROM detections WHERE inspection_id = ?"
+            " ORDER BY id DESC LIMIT ?",
+            (inspection_id, limit),
+        ).fetchall()
+        return [
+            {
+                "frame": frame,
+                "defect_type": CLASS_NAMES[defect_type],
+                "severity": SEVERITIES[severity],
+                "confidence": confidence,
+            }
+            for frame, defect_type, severity, confidence in rows
+        ]
+
+    def iter_history(self, filters=None, chunk_rows=50_000):
+        """Every detection matching ``filters``, newest first, as lists of at most ``chunk_rows`` raw tuples.
+
+        Tuples are ``(ts, panel_id, defect_type, severity, confidence,
+        inspection_id, frame, x1, y1, x2, y2)`` with type and severity as
+        indices. The rows come from one read snapshot; fetching in chunks
+        keeps memory bounded by ``chunk_rows`` whatever the result size.
+        """
+        clauses, params = (filters or HistoryFilter()).where()
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        cursor = self.conn.execute(
+            "SELECT ts, panel_id, defect_type, severity, confidence, inspection_id, frame, x1, y1, x2, y2"
+            f" FROM detections {where} ORDER BY ts DESC, id DESC",
+            params,
+        )
+        try:
+            while rows := cursor.fetchmany(chunk_rows):
+                yield rows
+        finally:
+            cursor.close()
+
+    def time_span(self):
+        """``(first, last)`` inspection timestamps, or ``None`` for an empty store."""
+        first, last = self.conn.execute("SELECT MIN(ts), MAX(ts) FROM inspections").fetchone()
+        return None if first is None else (first, last)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide detection store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DetectionStore()
+    return _store
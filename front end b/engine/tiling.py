@@ -0,0 +1,103 @@
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .detector import Detections
+from .pipeline import _stage
+
+TILE_SIZE = 1024
+TILE_OVERLAP = 0.2
+
+
+@dataclass
+class TileTiming:
+    tile: tuple
+    preprocess_ms: float
+    inference_ms: float
+    decode_ms: float
+    candidates: int
+
+
+def _starts(length, tile, step):
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, step))
+    return starts + [length - tile]
+
+
+def tile_grid(width, height, tile_size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """Tiles ``(x0, y0, x1, y1)`` covering the image, neighbours sharing ``overlap`` of a tile."""
+    step = max(1, int(tile_size * (1 - overlap)))
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in _starts(height, tile_size, step)
+        for x in _starts(width, tile_size, step)
+    ]
+
+
+def _seams(starts, ends):
+    """Core interval per tile along one axis: each overlap is split at its midpoint."""
+    cuts = [(s + e) / 2 for s, e in zip(starts[1:], ends[:-1])]
+    return dict(zip(starts, zip([-np.inf] + cuts, cuts + [np.inf])))
+
+
+def tile_seams(width, height, tile_size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """``(x_cuts, y_cuts)``: where ``detect_tiled`` hands objects from one tile to the next, for ``merge_fragments``."""
+    tiles = tile_grid(width, height, tile_size, overlap)
+    cuts = []
+    for lo, hi in ((0, 2), (1, 3)):
+        spans = sorted({(t[lo], t[hi]) for t in tiles})
+        cuts.append(np.array([(s + e) / 2 for (s, _), (_, e) in zip(spans[1:], spans[:-1])], dtype=np.float32))
+    return tuple(cuts)
+
+
+def _core_mask(boxes, tile, x_seams, y_seams):
+    """Keep boxes centred in the part of ``tile`` no neighbour owns, so each object survives in one tile only."""
+    left, right = x_seams[tile[0]]
+    top, bottom = y_seams[tile[1]]
+    cx = (boxes[:, 0] + boxes[:, 2]) / 2
+    cy = (boxes[:, 1] + boxes[:, 3]) / 2
+    return (cx >= left) & (cx < right) & (cy >= top) & (cy < bottom)
+
+
+def detect_tiled(image, detector, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, on_stage=None, timings=None):
+    """Detect on overlapping full-resolution tiles run as one batch, merged back into image coordinates.
+
+    Returns the merged candidates (before NMS) and a ``TileTiming`` per tile;
+    inference time is the batched forward pass shared out evenly. ``timings``
+    receives the whole-image stage totals.
+    """
+    h, w = image.shape[:2]
+    tiles = tile_grid(w, h, tile_size, overlap)
+    x_seams = _seams(*zip(*sorted({(t[0], t[2]) for t in tiles})))
+    y_seams = _seams(*zip(*sorted({(t[1], t[3]) for t in tiles})))
+
+    with _stage(on_stage, timings, 0):
+        inputs, meta, prep_ms = [], [], []
+        for x0, y0, x1, y1 in tiles:
+            start = time.perf_counter()
+            tile_input, tile_meta = detector.prepare(image[y0:y1, x0:x1])
+            prep_ms.append((time.perf_counter() - start) * 1000)
+            inputs.append(tile_input)
+            meta.append(tile_meta)
+        batch = detector.collate(inputs)
+
+    with _stage(on_stage, timings, 1):
+        start = time.perf_counter()
+        raw = detector.infer(batch)
+        infer_ms = (time.perf_counter() - start) * 1000 / len(tiles)
+
+        parts, tile_timings = [], []
+        for i, tile in enumerate(tiles):
+            start = time.perf_counter()
+            dets = detector.decode(raw[i:i + 1], meta[i:i + 1])[0]
+            boxes = dets.boxes + np.array([tile[0], tile[1], tile[0], tile[1]], dtype=np.float32)
+            keep = _core_mask(boxes, tile, x_seams, y_seams)
+            parts.append(Detections(boxes, dets.scores, dets.class_ids)[keep])
+            tile_timings.append(
+                TileTiming(tile, prep_ms[i], infer_ms, (time.perf_counter() - start) * 1000, int(keep.sum()))
+            )
+
+    return Detections.concat(parts), tile_timings
+
@@ -0,0 +1,162 @@
+import numpy as np
+
+from .detector import CLASS_SEVERITY, Detections
+
+TRACK_IOU = 0.3
+# Centroid distance, as a fraction of the track box diagonal, still accepted when IoU is too low (fast motion).
+TRACK_DISTANCE = 0.5
+MAX_MISSES = 2
+MIN_HITS = 2
+# Track/detection pairs considered when searching for a common shift.
+SHIFT_PAIRS = 1024
+
+
+def _iou_matrix(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def _centroids(boxes):
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+
+
+class Tracker:
+    """Greedy IoU / centroid tracker that gives detections persistent ids across video frames.
+
+    ``update`` takes the detections of an analyzed (key)frame and matches
+    them to live tracks of the same class at their predicted position, best
+    IoU first, falling back to centroid distance for boxes that moved too far
+    to overlap. Tracks move by their per-frame centroid velocity; a new track
+    starts with the median velocity of the tracks just matched, which on a
+    drone pass is the camera's motion. ``predict`` extrapolates the tracks
+    matched on the last keyframe to a frame in between. A track is dropped after
+    ``max_misses`` keyframes without a match and counts as a physical defect
+    once matched on ``min_hits`` keyframes, which filters one-frame flickers.
+    """
+
+    def __init__(self, iou=TRACK_IOU, distance=TRACK_DISTANCE, max_misses=MAX_MISSES, min_hits=MIN_HITS):
+        self.iou = iou
+        self.distance = distance
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.next_id = 1
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.class_ids = np.zeros(0, dtype=np.int32)
+        self.velocity = np.zeros((0, 2), dtype=np.float32)
+        self.last_frame = np.zeros(0, dtype=np.int64)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.misses = np.zeros(0, dtype=np.int64)
+        self.confirmed = {}
+
+    def _moved(self, frame, live=slice(None)):
+        shift = self.velocity[live] * (frame - self.last_frame[live])[:, None]
+        return self.boxes[live] + np.concatenate([shift, shift], axis=1).astype(np.float32)
+
+    def _match(self, predicted, boxes, class_ids):
+        """``(track_index, detection_index)`` pairs, each track and detection used at most once."""
+        iou = _iou_matrix(predicted, boxes)
+        diagonal = np.hypot(predicted[:, 2] - predicted[:, 0], predicted[:, 3] - predicted[:, 1])
+        distance = np.linalg.norm(_centroids(predicted)[:, None] - _centroids(boxes)[None], axis=2)
+        distance /= np.maximum(diagonal, 1e-6)[:, None]
+        same_class = self.class_ids[:, None] == class_ids[None, :]
+        allowed = same_class & ((iou >= self.iou) | (distance <= self.distance))
+        rows, cols = np.nonzero(allowed)
+        order = np.lexsort((distance[rows, cols], -iou[rows, cols]))
+        pairs, used_tracks, used_dets = [], set(), set()
+        for t, d in zip(rows[order].tolist(), cols[order].tolist()):
+            if t not in used_tracks and d not in used_dets:
+                used_tracks.add(t)
+                used_dets.add(d)
+                pairs.append((t, d))
+        return pairs
+
+    def _common_shift(self, predicted, boxes, class_ids):
+        """Offset shared by the most same-class track/detection pairs, or None without at least two agreeing.
+
+        Recovers the camera motion when it is too large for any track to
+        match at its predicted position, e.g. a fast pan before tracks have a
+        velocity or with long keyframe intervals.
+        """
+        rows, cols = np.nonzero(self.class_ids[:, None] == class_ids[None, :])
+        if len(rows) > SHIFT_PAIRS:
+            pick = np.linspace(0, len(rows) - 1, SHIFT_PAIRS).astype(int)
+            rows, cols = rows[pick], cols[pick]
+        shifts = _centroids(boxes)[cols] - _centroids(predicted)[rows]
+        diagonal = np.hypot(predicted[:, 2] - predicted[:, 0], predicted[:, 3] - predicted[:, 1])
+        tolerance = self.distance * np.median(diagonal)
+        agree = np.linalg.norm(shifts[:, None] - shifts[None], axis=2) <= tolerance
+        support = agree.sum(axis=1)
+        best = int(support.argmax()) if len(support) else 0
+        if not len(support) or support[best] < 2:
+            return None
+        return shifts[agree[best]].mean(axis=0)
+
+    def update(self, dets, frame):
+        """Match a keyframe's detections to tracks and return their track ids, aligned with ``dets``."""
+        pairs = []
+        if len(self.ids) and len(dets):
+            predicted = self._moved(frame)
+            pairs = self._match(predicted, dets.boxes, dets.class_ids)
+            if len(pairs) < min(len(self.ids), len(dets)) / 2:
+                shift = self._common_shift(predicted, dets.boxes, dets.class_ids)
+                if shift is not None:
+                    shifted = predicted + np.concatenate([shift, shift]).astype(np.float32)
+                    pairs = max(pairs, self._match(shifted, dets.boxes, dets.class_ids), key=len)
+        track_ids = np.zeros(len(dets), dtype=np.int64)
+        matched = np.zeros(len(self.ids), dtype=bool)
+        for t, d in pairs:
+            gap = max(frame - self.last_frame[t], 1)
+            motion = (_centroids(dets.boxes[d:d + 1])[0] - _centroids(self.boxes[t:t + 1])[0]) / gap
+            self.velocity[t] = motion if self.hits[t] == 1 else (self.velocity[t] + motion) / 2
+            self.boxes[t] = dets.boxes[d]
+            self.scores[t] = dets.scores[d]
+            self.last_frame[t] = frame
+            self.hits[t] += 1
+            matched[t] = True
+            track_ids[d] = self.ids[t]
+        self.misses[matched] = 0
+        self.misses[~matched] += 1
+
+        new = np.ones(len(dets), dtype=bool)
+        new[[d for _, d in pairs]] = False
+        new = np.flatnonzero(new)
+        new_ids = np.arange(self.next_id, self.next_id + len(new))
+        self.next_id += len(new)
+        track_ids[new] = new_ids
+        alive = self.misses <= self.max_misses
+        self.ids = np.concatenate([self.ids[alive], new_ids])
+        self.boxes = np.concatenate([self.boxes[alive], dets.boxes[new]])
+        self.scores = np.concatenate([self.scores[alive], dets.scores[new]])
+        self.class_ids = np.concatenate([self.class_ids[alive], dets.class_ids[new]])
+        camera = np.median(self.velocity[matched], axis=0) if matched.any() else np.zeros(2, dtype=np.float32)
+        self.velocity = np.concatenate([self.velocity[alive], np.tile(camera.astype(np.float32), (len(new), 1))])
+        self.last_frame = np.concatenate([self.last_frame[alive], np.full(len(new), frame)])
+        self.hits = np.concatenate([self.hits[alive], np.ones(len(new), dtype=np.int64)])
+        self.misses = np.concatenate([self.misses[alive], np.zeros(len(new), dtype=np.int64)])
+
+        confirmed = self.hits >= self.min_hits
+        for track_id, class_id in zip(self.ids[confirmed].tolist(), self.class_ids[confirmed].tolist()):
+            self.confirmed.setdefault(track_id, class_id)
+        return track_ids
+
+    def predict(self, frame):
+        """Tracks seen on the last keyframe, moved to ``frame``; returns ``(detections, track_ids)``."""
+        live = self.misses == 0
+        return Detections(self._moved(frame, live), self.scores[live], self.class_ids[live]), self.ids[live]
+
+    @property
+    def defects(self):
+        """Physical defects so far: confirmed tracks."""
+        return len(self.confirmed)
+
+    @property
+    def high_severity(self):
+        return sum(1 for class_id in self.confirmed.values() if CLASS_SEVERITY[class_id] == 0)
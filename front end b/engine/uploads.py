@@ -0,0 +1,81 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from dataclasses import dataclass, field
+
+SPOOL_DIR = os.environ.get(
+    "PV_SPOOL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "spool"),
+)
+CHUNK_BYTES = 8 << 20
+# Spool files older than this are left over from a crash or kill, not a live session.
+STALE_SECONDS = 24 * 3600
+
+_swept = False
+_sweep_lock = threading.Lock()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@dataclass(eq=False)
+class SpooledUpload:
+    """An upload copied to the spool directory; the file is deleted once nothing references this object.
+
+    Keep it in ``st.session_state``: when the session ends, or another upload
+    replaces it, the object is collected and its file removed. ``discard``
+    removes it straight away.
+    """
+
+    file_id: str
+    name: str
+    path: str
+    size: int
+    _finalizer: object = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self._finalizer = weakref.finalize(self, _remove, self.path)
+
+    def discard(self):
+        self._finalizer()
+
+
+def sweep_spool(spool_dir=SPOOL_DIR, max_age=STALE_SECONDS):
+    """Delete spool files not modified for ``max_age`` seconds; returns how many were removed."""
+    removed = 0
+    cutoff = time.time() - max_age
+    for entry in os.scandir(spool_dir):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            _remove(entry.path)
+            removed += 1
+    return removed
+
+
+def spool_upload(upload, spool_dir=SPOOL_DIR, chunk_bytes=CHUNK_BYTES):
+    """Copy the file-like ``upload`` (an ``UploadedFile``) to ``spool_dir`` in chunks and return a ``SpooledUpload``.
+
+    The first call in a process also sweeps stale files from earlier runs.
+    """
+    global _swept
+    os.makedirs(spool_dir, exist_ok=True)
+    if not _swept:
+        with _sweep_lock:
+            if not _swept:
+                sweep_spool(spool_dir)
+                _swept = True
+    path = os.path.join(spool_dir, f"{uuid.uuid4().hex}{os.path.splitext(upload.name)[1].lower()}")
+    upload.seek(0)
+    try:
+        with open(path, "wb") as out:
+            shutil.copyfileobj(upload, out, length=chunk_bytes)
+    except BaseException:
+        _remove(path)
+        raise
+    return SpooledUpload(upload.file_id, upload.name, path, os.path.getsize(path))
@@ -0,0 +1,233 @@
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+import cv2
+import numpy as np
+
+from .metrics import span
+from .pipeline import DECODING, STAGES
+from .postprocess import DEFAULT_CONFIDENCE, postprocess
+from .render import encode_jpeg, fit_width
+
+BATCH_SIZE = 8
+STRIP_FRAMES = 6
+STRIP_WIDTH = 320
+GATE_SIZE = 32
+# The gate lets a near-duplicate frame skip inference for at most this many frames in a row.
+MAX_REUSE = 30
+
+
+@dataclass
+class FrameResult:
+    index: int
+    timestamp: float
+    detections: object
+    frame: np.ndarray = None
+    reused: bool = False
+    track_ids: np.ndarray = None
+
+
+@dataclass
+class VideoSummary:
+    """Running totals for a video; updated per frame so nothing per-frame is retained.
+
+    ``defects`` and ``high_severity`` count boxes on analyzed frames;
+    ``tracked_defects`` and ``tracked_high_severity`` count physical defects
+    when a ``Tracker`` is used.
+    """
+
+    total_frames: int = 0
+    frames_processed: int = 0
+    frames_with_defects: int = 0
+    frames_reused: int = 0
+    defects: int = 0
+    high_severity: int = 0
+    confidence_sum: float = 0.0
+    tracked_defects: int = 0
+    tracked_high_severity: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    def update(self, result):
+        dets = result.detections
+        self.frames_processed += 1
+        self.frames_reused += result.reused
+        if len(dets):
+            self.frames_with_defects += 1
+            if not result.reused:
+                self.defects += len(dets)
+                self.high_severity += int((dets.severity_ids == 0).sum())
+                self.confidence_sum += float(dets.scores.sum())
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def avg_confidence(self):
+        return self.confidence_sum / self.defects if self.defects else 0.0
+
+    @property
+    def defect_frame_ratio(self):
+        return self.frames_with_defects / self.frames_processed if self.frames_processed else 0.0
+
+    @property
+    def fps(self):
+        return self.frames_processed / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def reuse_ratio(self):
+        return self.frames_reused / self.frames_processed if self.frames_processed else 0.0
+
+
+class FrameGate:
+    """Flags frames that barely differ from the last analyzed frame so its result can be reused.
+
+    Frames are compared as ``GATE_SIZE``-pixel grayscale thumbnails; novelty
+    is their mean absolute difference as a fraction of full scale. Comparing
+    against the last analyzed frame rather than the previous one means slow
+    drift still adds up to a new analysis, and ``max_reuse`` bounds how long
+    one result can stand in.
+    """
+
+    def __init__(self, threshold, max_reuse=MAX_REUSE):
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self._reference = None
+        self._reused = 0
+
+    def is_novel(self, frame):
+        if self.threshold <= 0:
+            return True
+        # Subsample to a few times the thumbnail size first; area-averaging a full HD frame costs more than the gate saves.
+        step = max(1, min(frame.shape[:2]) // (GATE_SIZE * 4))
+        thumb = cv2.resize(frame[::step, ::step], (GATE_SIZE, GATE_SIZE), interpolation=cv2.INTER_AREA)
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_RGB2GRAY)
+        if (
+            self._reference is None
+            or self._reused >= self.max_reuse
+            or cv2.absdiff(thumb, self._reference).mean() / 255 >= self.threshold
+        ):
+            self._reference = thumb
+            self._reused = 0
+            return True
+        self._reused += 1
+        return False
+
+
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        return {
+            "frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "fps": cap.get(cv2.CAP_PROP_FPS) or 0.0,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def keyframe_strip(path, count=STRIP_FRAMES, width=STRIP_WIDTH):
+    """``(timestamp, jpeg)`` for ``count`` evenly spaced frames of ``path``, each at most ``width`` pixels wide.
+
+    A preview that costs a few seeks instead of sending the whole video to the browser.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+    try:
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        strip = []
+        for index in np.linspace(0, max(frames - 1, 0), min(count, max(frames, 1))).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ok, frame = cap.read()
+            if ok:
+                thumb, _ = fit_width(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), width)
+                strip.append((index / fps if fps else 0.0, encode_jpeg(thumb)))
+        return strip
+    finally:
+        cap.release()
+
+
+def iter_frames(path, stride=1):
+    """Decode ``path`` lazily, yielding ``(index, timestamp, rgb_frame)`` for every ``stride``-th frame."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    index = 0
+    try:
+        while True:
+            if index % stride:
+                if not cap.grab():
+                    break
+            else:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                yield index, index / fps if fps else 0.0, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+    finally:
+        cap.release()
+
+
+def batched(iterable, size):
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def analyze_video(path, detector, confidence=DEFAULT_CONFIDENCE, class_ids=None, batch_size=BATCH_SIZE, stride=1,
+                  keep_frames=False, summary=None, timings=None, novelty_threshold=0.0, keyframe_interval=1,
+                  tracker=None):
+    """Stream ``FrameResult`` objects for ``path``, running the detector on at most ``batch_size`` frames at a time.
+
+    Only the current batch is held in memory. Pass a ``VideoSummary`` to have
+    it updated as results are produced, and a ``StageTimings`` to have frame
+    decoding, preprocessing, inference and post-processing time added to it.
+
+    Inference runs on keyframes only: every ``keyframe_interval``-th frame,
+    postponed while a ``FrameGate`` with ``novelty_threshold`` above 0 finds
+    the frame too similar to the last analyzed one. Frames in between are
+    marked ``reused`` and get the ``tracker``'s propagated boxes, or repeat
+    the last keyframe's detections without one. With a ``Tracker`` every
+    result carries ``track_ids`` aligned with its detections.
+    """
+    gate = FrameGate(novelty_threshold)
+    previous, previous_ids = None, None
+    since_keyframe = keyframe_interval
+    batches = batched(iter_frames(path, stride), batch_size)
+    while True:
+        with span(timings, DECODING):
+            batch = next(batches, None)
+        if batch is None:
+            return
+        with span(timings, STAGES[0]):
+            keyframes = []
+            for _, _, frame in batch:
+                is_keyframe = since_keyframe >= keyframe_interval and gate.is_novel(frame)
+                since_keyframe = 1 if is_keyframe else since_keyframe + 1
+                keyframes.append(is_keyframe)
+            analyzed = [frame for (_, _, frame), is_keyframe in zip(batch, keyframes) if is_keyframe]
+            if analyzed:
+                inputs, meta = detector.preprocess(analyzed)
+        if analyzed:
+            with span(timings, STAGES[1]):
+                candidates = iter(detector.decode(detector.infer(inputs), meta))
+        for (index, ts, frame), is_keyframe in zip(batch, keyframes):
+            with span(timings, STAGES[2]):
+                if is_keyframe:
+                    previous = postprocess(next(candidates), confidence, class_ids)
+                    if tracker is not None:
+                        previous_ids = tracker.update(previous, index)
+                        if summary is not None:
+                            summary.tracked_defects = tracker.defects
+                            summary.tracked_high_severity = tracker.high_severity
+                elif tracker is not None:
+                    previous, previous_ids = tracker.predict(index)
+            result = FrameResult(
+                index, ts, previous, frame if keep_frames else None, reused=not is_keyframe, track_ids=previous_ids
+            )
+            if summary is not None:
+                summary.update(result)
+            yield result
@@ -1,8 +1,32 @@
-import streamlit as st
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont
 import time
-import io
+
+import streamlit as st
+
+started = time.perf_counter()
+
+from engine.startup import PageProfile, preload_modules
+
+profile = PageProfile("Detection", started)
+
+import os
+
+from engine import CLASS_NAMES, class_ids_for, detect_candidates, finalize, preload_detector
+from engine.cache import get_result_cache, result_key
+from engine.detector import PRECISION, PRECISIONS, available_precisions, source_label
+from engine.evaluate import load_report
+from engine.ingest import decode_image
+from engine.jobs import get_job_queue
+from engine.memory import session_memory
+from engine.metrics import StageTimings, registry, start_metrics_server
+from engine.pipeline import DECODING, STAGES
+from engine.render import DISPLAY_WIDTH, MAX_DRAWN, draw_detections, encode_jpeg, fit_width, render_full
+from engine.service import get_inference_service, service_stats
+from engine.store import get_store
+from engine.tiling import TILE_OVERLAP, TILE_SIZE, detect_tiled, tile_seams
+from engine.uploads import spool_upload
+from engine.video import keyframe_strip, video_info
+
+profile.imported()
 
 st.set_page_config(
     page_title="Detection - PV Module Defect Detection",
@@ -10,6 +34,23 @@ st.set_page_config(
     layout="wide"
 )
 
+preload_detector()
+start_metrics_server()
+result_cache = get_result_cache()
+detection_store = get_store()
+job_queue = get_job_queue()
+memory = session_memory(st.session_state)
+
+JOB_POLL_SECONDS = 1.0
+# Low thresholds on tiled images leave thousands of boxes: cards for the top few, a table for the rest.
+DETECTION_CARDS = 10
+DETECTION_ROWS = 1000
+FALLBACK_WARNING = (
+    "These detections come from the classical fallback, an untrained contrast heuristic used because no "
+    "model is deployed. Treat them as leads to inspect, not as confirmed defects; they are recorded with "
+    "the source marked \"(classical fallback)\"."
+)
+
 st.markdown("""
     <style>
     .detection-header {
@@ -84,25 +125,91 @@ with col1:
         )
 
         if uploaded_file is not None:
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Uploaded Image", use_container_width=True)
+            # Streamlit holds the upload itself for as long as the widget shows it.
+            memory.put("upload", uploaded_file.file_id, size=uploaded_file.size, pinned=True)
+            upload_preview = memory.get("upload_preview")
+            if upload_preview is None or upload_preview["file_id"] != uploaded_file.file_id:
+                preview_pixels, preview_decode = decode_image(uploaded_file.getvalue(), min_width=DISPLAY_WIDTH)
+                preview_base, preview_scale = fit_width(preview_pixels)
+                upload_preview = {
+                    "file_id": uploaded_file.file_id,
+                    "base": preview_base,
+                    "scale": preview_scale * preview_decode.scale,
+                    "decode": preview_decode,
+                    "jpeg": encode_jpeg(preview_base),
+                    "annotated": {},
+                }
+                memory.put("upload_preview", upload_preview)
+            st.image(upload_preview["jpeg"], caption="Uploaded Image", use_container_width=True)
+            preview_decode = upload_preview["decode"]
+            st.caption(
+                f"Preview decoded at {preview_decode.decoded_size[0]}×{preview_decode.decoded_size[1]} "
+                f"from {preview_decode.source_size[0]}×{preview_decode.source_size[1]} in "
+                f"{preview_decode.elapsed_ms:.0f} ms · est. peak {preview_decode.estimated_peak_bytes / 2**20:.1f} MB"
+            )
 
             analyze_button = st.button("🔬 Analyze Image", type="primary", use_container_width=True)
     else:
-        uploaded_file = st.file_uploader(
+        # Each upload is spooled to disk and the uploader is then re-keyed, so Streamlit drops its in-memory copy.
+        uploader_generation = st.session_state.setdefault("video_uploader_generation", 0)
+        new_upload = st.file_uploader(
             "Choose a video...",
             type=["mp4", "avi", "mov", "mkv"],
+            key=f"video_uploader_{uploader_generation}",
             help="Upload solar panel videos for defect detection"
         )
+        uploaded_file = st.session_state.get("video_upload")
+        if uploaded_file is not None and not os.path.exists(uploaded_file.path):
+            del st.session_state["video_upload"]
+            uploaded_file = None
+        if new_upload is not None and (uploaded_file is None or uploaded_file.file_id != new_upload.file_id):
+            with st.spinner("Saving upload to disk..."):
+                uploaded_file = spool_upload(new_upload)
+            st.session_state["video_upload"] = uploaded_file
+            st.session_state["video_uploader_generation"] = uploader_generation + 1
 
         if uploaded_file is not None:
-            st.video(uploaded_file)
+            video_strip = memory.get("video_strip")
+            if video_strip is None or video_strip["file_id"] != uploaded_file.file_id:
+                video_strip = memory.put("video_strip", {
+                    "file_id": uploaded_file.file_id,
+                    "info": video_info(uploaded_file.path),
+                    "frames": keyframe_strip(uploaded_file.path),
+                })
+            if video_strip["frames"]:
+                st.image(
+                    [jpeg for _, jpeg in video_strip["frames"]],
+                    caption=[f"{ts:.1f}s" for ts, _ in video_strip["frames"]],
+                    width=160,
+                )
+            info = video_strip["info"]
+            st.caption(
+                f"{uploaded_file.name} · {uploaded_file.size / 2**20:.1f} MB · {info['width']}×{info['height']} · "
+                f"{info['frames']} frames" + (f" ({info['frames'] / info['fps']:.0f} s)" if info["fps"] else "")
+            )
+            def remove_video():
+                memory.discard("video_strip")
+                st.session_state.pop("video_upload").discard()
+
+            st.button("🗑️ Remove Video", on_click=remove_video, use_container_width=True)
             analyze_button = st.button("🔬 Analyze Video", type="primary", use_container_width=True)
 
     st.markdown('</div>', unsafe_allow_html=True)
 
+    if upload_type != "Image" or uploaded_file is None:
+        # The image is gone from the uploader; so is everything derived from it.
+        for key in ("upload", "upload_preview", "image_analysis", "full_resolution"):
+            memory.discard(key)
+    if upload_type != "Video" or uploaded_file is None:
+        memory.discard("video_strip")
+
     if uploaded_file is not None:
         st.markdown("### ⚙️ Detection Settings")
+        panel_id = st.text_input(
+            "Panel ID",
+            value=os.path.splitext(uploaded_file.name)[0],
+            help="Identifier the results are recorded under in the dashboard history"
+        )
         confidence_threshold = st.slider(
             "Confidence Threshold",
             min_value=0.0,
@@ -114,86 +221,345 @@ with col1:
 
         defect_types = st.multiselect(
             "Defect Types to Detect",
-            ["Cracks", "Hotspots", "Discoloration", "Delamination", "Snail Trails", "PID", "Soiling"],
-            default=["Cracks", "Hotspots", "Discoloration"],
+            CLASS_NAMES,
+            default=CLASS_NAMES,
             help="Select which types of defects to analyze"
         )
 
+        precisions = available_precisions()
+        precision = st.selectbox(
+            "Model Precision",
+            [name.upper() for name in precisions],
+            index=precisions.index(PRECISION) if PRECISION in precisions else 0,
+            help="INT8 runs a copy of the model quantized for CPU inference; compare the two on labelled "
+                 "images with `python -m engine.evaluate <folder>`"
+        ).lower()
+        if len(precisions) < len(PRECISIONS):
+            st.warning("No ONNX model is deployed, so INT8 is unavailable: the classical detector runs at FP32.")
+        preload_detector(precision)
+        evaluation = load_report()
+        if evaluation is not None and evaluation["results"]:
+            st.caption("Last evaluation: " + " · ".join(
+                f"{result['precision_mode'].upper()} {result['latency_ms']['mean']:.0f} ms/image, "
+                f"precision {result['precision']:.1%}, recall {result['recall']:.1%}"
+                for result in evaluation["results"]
+            ))
+
+        if upload_type == "Image":
+            tiled_inference = st.toggle(
+                "Tiled Inference (high-resolution)",
+                value=max(upload_preview["decode"].source_size) > 2 * TILE_SIZE,
+                help="Analyze overlapping full-resolution tiles instead of downscaling the whole image"
+            )
+            if tiled_inference:
+                tile_size = st.select_slider(
+                    "Tile Size (px)",
+                    options=[512, 640, 1024, 1280, 1600, 2048],
+                    value=TILE_SIZE,
+                    help="Edge length of each square tile"
+                )
+                tile_overlap = st.slider(
+                    "Tile Overlap",
+                    min_value=0.0,
+                    max_value=0.5,
+                    value=TILE_OVERLAP,
+                    step=0.05,
+                    help="Fraction of a tile shared with its neighbours so defects on a seam are seen whole"
+                )
+        else:
+            novelty_threshold = st.slider(
+                "Frame Change Threshold",
+                min_value=0.0,
+                max_value=0.1,
+                value=0.01,
+                step=0.005,
+                format="%.3f",
+                help="Frames whose mean pixel change from the last analyzed frame is below this reuse its "
+                     "detections instead of running the model; 0 analyzes every frame"
+            )
+            keyframe_interval = st.slider(
+                "Keyframe Interval",
+                min_value=1,
+                max_value=30,
+                value=5,
+                help="Run the model on every n-th frame and track defects in between; "
+                     "keep the camera's motion between keyframes under a defect's width"
+            )
+
 with col2:
     st.markdown('<div class="upload-section">', unsafe_allow_html=True)
     st.subheader("📊 Detection Results")
 
+    image_params = None
+    if upload_type == "Image" and uploaded_file is not None:
+        image_params = (
+            uploaded_file.file_id,
+            precision,
+            tiled_inference,
+            tile_size if tiled_inference else None,
+            tile_overlap if tiled_inference else None,
+        )
+    image_analysis = memory.get("image_analysis")
+    if image_analysis is not None and image_analysis["params"] != image_params:
+        image_analysis = None
+    show_tips = True
+    on_stage = None
+    analyzed_now = False
+
     if uploaded_file is not None and 'analyze_button' in locals() and analyze_button:
         with st.spinner("🔄 Processing... Analyzing defects..."):
-            progress_bar = st.progress(0)
-            for i in range(100):
-                time.sleep(0.01)
-                progress_bar.progress(i + 1)
-
-            st.success("✅ Analysis Complete!")
-
             if upload_type == "Image":
-                annotated_image = image.copy()
-                draw = ImageDraw.Draw(annotated_image)
-
-                mock_detections = [
-                    {"type": "Crack", "confidence": 0.89, "bbox": (100, 100, 250, 200), "severity": "High"},
-                    {"type": "Hotspot", "confidence": 0.76, "bbox": (300, 150, 400, 250), "severity": "Medium"},
-                    {"type": "Discoloration", "confidence": 0.65, "bbox": (200, 300, 350, 400), "severity": "Low"},
-                ]
-
-                colors = {"High": "#e74c3c", "Medium": "#f39c12", "Low": "#27ae60"}
-
-                for det in mock_detections:
-                    bbox = det["bbox"]
-                    color = colors[det["severity"]]
-                    draw.rectangle(bbox, outline=color, width=3)
-                    draw.text((bbox[0], bbox[1] - 20), f"{det['type']} ({det['confidence']:.2f})", fill=color)
-
-                st.image(annotated_image, caption="Annotated Results", use_container_width=True)
-
-                st.markdown("### 📋 Detected Defects")
-
-                for det in mock_detections:
-                    severity_class = f"{det['severity'].lower()}-severity"
-                    st.markdown(f"""
-                        <div class="result-card">
-                            <span class="defect-badge {severity_class}">{det['severity']} Severity</span>
-                            <h4>🔸 {det['type']}</h4>
-                            <p><strong>Confidence:</strong> {det['confidence']:.1%}</p>
-                            <p><strong>Location:</strong> ({det['bbox'][0]}, {det['bbox'][1]}) to ({det['bbox'][2]}, {det['bbox'][3]})</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-
-                st.markdown("### 📈 Summary Statistics")
-                col_a, col_b, col_c = st.columns(3)
-                with col_a:
-                    st.metric("Total Defects", len(mock_detections))
-                with col_b:
-                    st.metric("Avg Confidence", f"{np.mean([d['confidence'] for d in mock_detections]):.1%}")
-                with col_c:
-                    st.metric("High Severity", sum(1 for d in mock_detections if d['severity'] == 'High'))
+                detector = get_inference_service(precision)
+                progress_bar = st.progress(0)
+                on_stage = lambda stage, done: progress_bar.progress(done, text=f"{stage}...")
+                tile_timings = None
+                analysis_timings = StageTimings()
+                cache_key = result_key(
+                    uploaded_file.getvalue(), detector.version,
+                    tiled=tiled_inference,
+                    tile_size=tile_size if tiled_inference else None,
+                    tile_overlap=tile_overlap if tiled_inference else None,
+                )
+                candidates = result_cache.get(cache_key)
+                if candidates is None:
+                    if tiled_inference:
+                        with analysis_timings.span(DECODING):
+                            pixels, analysis_decode = decode_image(uploaded_file.getvalue())
+                        candidates, tile_timings = detect_tiled(
+                            pixels, detector, tile_size, tile_overlap, on_stage=on_stage, timings=analysis_timings
+                        )
+                    else:
+                        with analysis_timings.span(DECODING):
+                            pixels, analysis_decode = decode_image(
+                                uploaded_file.getvalue(), min_side=detector.input_size
+                            )
+                        candidates = detect_candidates(pixels, detector, on_stage=on_stage, timings=analysis_timings)
+                        candidates = candidates.scaled(1 / analysis_decode.scale)
+                    del pixels
+                    result_cache.put(cache_key, candidates)
+                else:
+                    analysis_decode = None
+
+                image_analysis = {
+                    "params": image_params,
+                    "key": cache_key,
+                    "candidates": candidates,
+                    "tile_timings": tile_timings,
+                    "decode": analysis_decode,
+                    "timings": analysis_timings,
+                    "fallback": detector.fallback,
+                }
+                memory.put("image_analysis", image_analysis)
+                analyzed_now = True
 
             else:
-                st.info("📹 Video analysis results will be displayed here")
-                st.markdown("""
-                    <div class="result-card">
-                        <h4>Video Analysis Summary</h4>
-                        <p><strong>Total Frames:</strong> 450</p>
-                        <p><strong>Frames with Defects:</strong> 78 (17.3%)</p>
-                        <p><strong>Processing Time:</strong> 45.2 seconds</p>
-                    </div>
-                """, unsafe_allow_html=True)
-
-                col_a, col_b, col_c = st.columns(3)
-                with col_a:
-                    st.metric("Defects Found", 23)
-                with col_b:
-                    st.metric("Avg Confidence", "82%")
-                with col_c:
-                    st.metric("Critical Issues", 5)
+                st.session_state["video_job"] = job_queue.submit_video(
+                    uploaded_file.path, panel_id, uploaded_file.name, confidence_threshold, class_ids_for(defect_types),
+                    novelty_threshold, keyframe_interval, precision,
+                )
+
+    video_job = None
+    if upload_type == "Video" and "video_job" in st.session_state:
+        video_job = job_queue.get(st.session_state["video_job"])
+    if video_job is not None:
+        show_tips = False
+        st.progress(
+            video_job.progress,
+            text=f"Job #{video_job.id} {video_job.status} · frame {video_job.frames_processed}/"
+                 f"{video_job.total_frames} ({video_job.fps:.1f} fps)",
+        )
+        if video_job.active:
+            st.button("⏹️ Cancel Job", on_click=job_queue.cancel, args=(video_job.id,), use_container_width=True)
+        job_preview = job_queue.preview(video_job.id)
+        if job_preview is not None:
+            frame_index, frame_time, frame_jpeg = job_preview
+            st.image(frame_jpeg, caption=f"Frame {frame_index} ({frame_time:.1f}s)", use_container_width=True)
+        if get_inference_service(video_job.precision).fallback:
+            st.warning(FALLBACK_WARNING)
+
+        if video_job.status == "done":
+            st.success("✅ Analysis Complete!")
+            st.markdown(f"""
+                <div class="result-card">
+                    <h4>Video Analysis Summary</h4>
+                    <p><strong>Total Frames:</strong> {video_job.frames_processed}</p>
+                    <p><strong>Frames with Defects:</strong> {video_job.frames_with_defects} ({video_job.defect_frame_ratio:.1%})</p>
+                    <p><strong>Processing Time:</strong> {video_job.elapsed:.1f} seconds ({video_job.fps:.1f} fps)</p>
+                    <p><strong>Inference Calls Saved:</strong> {video_job.frames_reused} ({video_job.reuse_ratio:.1%} of frames filled in by tracking)</p>
+                </div>
+            """, unsafe_allow_html=True)
+        elif video_job.status == "failed":
+            st.error(f"Analysis failed: {video_job.error}")
+        elif video_job.status == "cancelled":
+            st.warning("Analysis cancelled; detections up to that point were recorded.")
+        else:
+            st.markdown(
+                f"**Frames analyzed:** {video_job.frames_processed} &nbsp; "
+                f"**Frames with defects:** {video_job.frames_with_defects} &nbsp; "
+                f"**Inference calls saved:** {video_job.frames_reused} &nbsp; "
+                f"**Defects tracked:** {video_job.tracked_defects}"
+            )
+
+        if video_job.inspection_id is not None:
+            st.dataframe(
+                [
+                    {
+                        "Frame": det["frame"],
+                        "Defect Type": det["defect_type"],
+                        "Severity": det["severity"],
+                        "Confidence": f"{det['confidence']:.1%}",
+                    }
+                    for det in detection_store.inspection_detections(video_job.inspection_id)
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+
+        job_timings = job_queue.timings(video_job.id)
+        if job_timings is not None and job_timings.stages:
+            with st.expander(f"⏱️ Stage Timings ({job_timings.total:.1f} s)"):
+                st.dataframe(job_timings.rows(), use_container_width=True, hide_index=True)
+
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            st.metric("Defects Found", video_job.tracked_defects, help="Distinct defects tracked across frames")
+        with col_b:
+            st.metric("Avg Confidence", f"{video_job.avg_confidence:.1%}")
+        with col_c:
+            st.metric("Critical Issues", video_job.tracked_high_severity)
+
+    if image_analysis is not None:
+        show_tips = False
+        candidates = image_analysis["candidates"]
+        run_timings = StageTimings().merge(image_analysis["timings"])
+        filter_start = time.perf_counter()
+        seams = tile_seams(*upload_preview["decode"].source_size, tile_size, tile_overlap) if tiled_inference else None
+        dets, detections = finalize(
+            candidates, confidence_threshold, class_ids_for(defect_types),
+            merge=tiled_inference, on_stage=on_stage, timings=run_timings, seams=seams, max_records=DETECTION_ROWS
+        )
+        render_key = (image_params, confidence_threshold, tuple(defect_types))
+        with run_timings.span(STAGES[4]):
+            annotated_preview = upload_preview["annotated"].get(render_key)
+            if annotated_preview is None:
+                annotated_preview = encode_jpeg(draw_detections(upload_preview["base"], dets, upload_preview["scale"]))
+                if len(upload_preview["annotated"]) >= 8:
+                    upload_preview["annotated"].pop(next(iter(upload_preview["annotated"])))
+                upload_preview["annotated"][render_key] = annotated_preview
+                memory.put("upload_preview", upload_preview)
+        filter_ms = (time.perf_counter() - filter_start) * 1000
+
+        if analyzed_now:
+            registry.observe(run_timings, "image", defects=len(dets), precision=precision)
+            # Re-analyzing an upload this session already recorded would count its defects twice.
+            recorded = st.session_state.setdefault("recorded_analyses", set())
+            if image_analysis["key"] not in recorded:
+                detection_store.record_inspection(
+                    panel_id, dets, source=source_label(uploaded_file.name, image_analysis["fallback"]), media="image"
+                )
+                recorded.add(image_analysis["key"])
+            progress_bar.progress(1.0, text="Done")
+            st.success("✅ Analysis Complete!")
 
-    else:
+        st.image(annotated_preview, caption="Annotated Results", use_container_width=True)
+        st.caption(
+            f"{len(candidates)} candidates filtered and drawn in {filter_ms:.0f} ms"
+            + (f" · only the {MAX_DRAWN} most confident boxes are drawn" if len(dets) > MAX_DRAWN else "")
+        )
+        analysis_decode = image_analysis["decode"]
+        if analysis_decode is not None:
+            st.caption(
+                f"Analysis input decoded at {analysis_decode.decoded_size[0]}×{analysis_decode.decoded_size[1]} in "
+                f"{analysis_decode.elapsed_ms:.0f} ms · est. peak {analysis_decode.estimated_peak_bytes / 2**20:.1f} MB"
+            )
+
+        full_resolution = memory.get("full_resolution")
+        if full_resolution is None or full_resolution["key"] != render_key:
+            if st.button("🖼️ Prepare Full-Resolution Image", use_container_width=True):
+                full_resolution = {
+                    "key": render_key,
+                    "jpeg": render_full(decode_image(uploaded_file.getvalue())[0], dets),
+                }
+                memory.put("full_resolution", full_resolution)
+        if full_resolution is not None and full_resolution["key"] == render_key:
+            st.download_button(
+                label="📥 Download Annotated Image",
+                data=full_resolution["jpeg"],
+                file_name=f"{os.path.splitext(uploaded_file.name)[0]}_annotated.jpg",
+                mime="image/jpeg",
+                use_container_width=True
+            )
+
+        st.markdown("### 📋 Detected Defects")
+        if image_analysis["fallback"]:
+            st.warning(FALLBACK_WARNING)
+
+        for det in detections[:DETECTION_CARDS]:
+            severity_class = f"{det['severity'].lower()}-severity"
+            st.markdown(f"""
+                <div class="result-card">
+                    <span class="defect-badge {severity_class}">{det['severity']} Severity</span>
+                    <h4>🔸 {det['type']}</h4>
+                    <p><strong>Confidence:</strong> {det['confidence']:.1%}</p>
+                    <p><strong>Location:</strong> ({det['bbox'][0]}, {det['bbox'][1]}) to ({det['bbox'][2]}, {det['bbox'][3]})</p>
+                </div>
+            """, unsafe_allow_html=True)
+        if len(dets) > DETECTION_CARDS:
+            with st.expander(f"All {len(dets):,} detections"):
+                st.dataframe(
+                    [
+                        {
+                            "Defect Type": det["type"],
+                            "Severity": det["severity"],
+                            "Confidence": f"{det['confidence']:.1%}",
+                            "Location": f"({det['bbox'][0]}, {det['bbox'][1]}) to ({det['bbox'][2]}, {det['bbox'][3]})",
+                        }
+                        for det in detections
+                    ],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+                if len(dets) > len(detections):
+                    st.caption(f"Showing the {len(detections):,} most confident; raise the threshold to narrow it down")
+
+        st.markdown("### 📈 Summary Statistics")
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            st.metric("Total Defects", len(dets))
+        with col_b:
+            st.metric("Avg Confidence", f"{dets.scores.mean():.1%}" if len(dets) else "–")
+        with col_c:
+            st.metric("High Severity", int((dets.severity_ids == 0).sum()))
+
+        with st.expander(f"⏱️ Stage Timings ({run_timings.total * 1000:.0f} ms)"):
+            st.dataframe(run_timings.rows(), use_container_width=True, hide_index=True)
+            if STAGES[1] not in run_timings.stages:
+                st.caption("Candidates came from the result cache, so decoding and inference did not run")
+
+        tile_timings = image_analysis["tile_timings"]
+        if tile_timings:
+            with st.expander(f"⏱️ Per-Tile Timings ({len(tile_timings)} tiles)"):
+                st.dataframe(
+                    [
+                        {
+                            "Tile": f"({t.tile[0]}, {t.tile[1]}) to ({t.tile[2]}, {t.tile[3]})",
+                            "Preprocess (ms)": round(t.preprocess_ms, 1),
+                            "Inference (ms)": round(t.inference_ms, 1),
+                            "Decode (ms)": round(t.decode_ms, 1),
+                            "Candidates": t.candidates,
+                        }
+                        for t in tile_timings
+                    ],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+    if show_tips and image_params is not None and memory.was_evicted("image_analysis"):
+        st.info("♻️ Results for this image were released to keep server memory within budget; "
+                "analyze it again to bring them back")
+        show_tips = False
+
+    if show_tips:
         st.info("👆 Upload an image or video and click 'Analyze' to begin detection")
         st.markdown("""
             <div class="result-card">
@@ -210,6 +576,61 @@ with col2:
 
     st.markdown('</div>', unsafe_allow_html=True)
 
+with st.sidebar:
+    st.markdown("### 🗄️ Result Cache")
+    cache_stats = result_cache.stats()
+    st.caption(
+        f"Hits: {cache_stats['memory_hits']} memory / {cache_stats['disk_hits']} disk · "
+        f"Misses: {cache_stats['misses']} · Hit rate: {cache_stats['hit_rate']:.0%}"
+    )
+
+    st.markdown("### ⚡ Inference Service")
+    if uploaded_file is not None:
+        service_precision = precision
+    else:
+        service_precision = PRECISION if PRECISION in available_precisions() else PRECISIONS[0]
+    inference_stats = service_stats(service_precision)
+    if inference_stats is None:
+        st.caption(f"{service_precision.upper()} model starts with the first analysis")
+    else:
+        st.caption(
+            f"{service_precision.upper()} · Queue depth: {inference_stats['queue_depth']} · Batches: {inference_stats['batches']} · "
+            f"Mean batch: {inference_stats['mean_batch_size']:.1f} images / "
+            f"{inference_stats['requests_per_batch']:.1f} requests · "
+            f"Wait: {inference_stats['mean_wait_ms']:.0f} ms · Forward: {inference_stats['mean_infer_ms']:.0f} ms"
+        )
+
+    st.markdown("### 🧠 Session Memory")
+    session_usage = memory.usage()
+    memory_stats = memory.manager.stats()
+    st.progress(
+        min(session_usage["bytes"] / session_usage["budget"], 1.0),
+        text=f"This session: {session_usage['bytes'] / 2**20:.1f} of {session_usage['budget'] / 2**20:.0f} MB",
+    )
+    st.caption(
+        f"All sessions: {memory_stats['bytes'] / 2**20:.1f} of {memory_stats['budget'] / 2**20:.0f} MB · "
+        f"{memory_stats['sessions']} sessions · Evictions: {memory_stats['evictions']} "
+        f"({memory_stats['evicted_bytes'] / 2**20:.1f} MB)"
+    )
+
+    st.markdown("### 🎬 Video Jobs")
+    recent_jobs = job_queue.list(limit=10)
+    if recent_jobs:
+        for job in recent_jobs[:5]:
+            st.caption(f"#{job.id} {job.panel_id} · {job.status} {job.progress:.0%}")
+        job_ids = {f"#{job.id} {job.panel_id} ({job.source})": job.id for job in recent_jobs}
+        followed_job = st.session_state.get("video_job")
+        st.selectbox(
+            "Follow job",
+            list(job_ids),
+            index=list(job_ids.values()).index(followed_job) if followed_job in job_ids.values() else 0,
+            key="followed_job",
+            on_change=lambda: st.session_state.update(video_job=job_ids[st.session_state["followed_job"]]),
+            help="Jobs keep running across reruns, page switches and reloads; pick one to watch in Video mode",
+        )
+    else:
+        st.caption("No video jobs yet")
+
 st.markdown("---")
 
 with st.expander("ℹ️ About Detection Process"):
@@ -236,3 +657,11 @@ with st.expander("ℹ️ About Detection Process"):
 
         - **Bird Droppings**: Localized soiling leading to temporary shading and power loss
     """)
+
+profile.rendered()
+preload_modules()
+
+if video_job is not None and video_job.active:
+    # Poll the running job; any widget interaction interrupts the wait and reruns at once.
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
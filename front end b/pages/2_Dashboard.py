@@ -1,8 +1,24 @@
+import time
+
 import streamlit as st
+
+started = time.perf_counter()
+
+from engine.startup import PageProfile
+
+profile = PageProfile("Dashboard", started)
+
 import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
-import numpy as np
+
+from engine.dashboard import RESOLUTIONS, WEBGL_THRESHOLD, history_frame, load_datasets, load_trend, query_cache
+from engine.detector import CLASS_NAMES, SEVERITIES
+from engine.evaluate import load_report
+from engine.export import DOWNLOAD_MAX_BYTES, FORMATS, export_history
+from engine.memory import session_memory
+from engine.store import HistoryFilter, get_store
+
+profile.imported()
 
 st.set_page_config(
     page_title="Dashboard - Solar Panel Defect Detection",
@@ -54,47 +70,34 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-np.random.seed(42)
-
-defect_data = pd.DataFrame({
-    'Defect Type': ['Cracks', 'Hotspots', 'Scratches', 'Broken grids', 'Defaced', 'Dust', 'Bird Droppings'],
-    'Count': [145, 98, 76, 54, 43, 31, 89]
-})
-
-severity_data = pd.DataFrame({
-    'Severity': ['High', 'Medium', 'Low'],
-    'Count': [123, 189, 224]
-})
-
-dates = pd.date_range(start='2024-01-01', end='2024-12-13', freq='W')
-time_series_data = pd.DataFrame({
-    'Date': dates,
-    'Defects': np.random.poisson(lam=15, size=len(dates))
-})
+datasets = load_datasets()
+totals = datasets['totals']
+defect_data = datasets['by_type']
+severity_data = datasets['by_severity']
 
 st.markdown("### 📈 Key Metrics")
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    st.markdown("""
+    st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">536</div>
+            <div class="metric-value">{totals['defects']:,}</div>
             <div class="metric-label">Total Defects Detected</div>
         </div>
     """, unsafe_allow_html=True)
 
 with col2:
-    st.markdown("""
+    st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">1,247</div>
+            <div class="metric-value">{totals['panels']:,}</div>
             <div class="metric-label">Panels Inspected</div>
         </div>
     """, unsafe_allow_html=True)
 
 with col3:
-    st.markdown("""
+    st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">43.0%</div>
+            <div class="metric-value">{totals['defect_rate']:.1%}</div>
             <div class="metric-label">Defect Rate</div>
         </div>
     """, unsafe_allow_html=True)
@@ -180,18 +183,56 @@ with col2:
 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
 st.markdown("#### 📅 Defect Detection Trend Over Time")
 
+store = get_store()
+memory = session_memory(st.session_state)
+span = store.time_span()
+today = pd.Timestamp.now().date()
+first_day = pd.Timestamp.fromtimestamp(span[0]).date() if span else today
+
+tcol1, tcol2, tcol3 = st.columns([2, 1, 2])
+with tcol1:
+    trend_range = st.date_input("Trend range", value=(first_day, today), max_value=today, key="trend_range")
+with tcol2:
+    trend_resolution = st.selectbox("Resolution", ["Auto", *RESOLUTIONS], key="trend_resolution")
+
+trend_start, trend_end = (trend_range + (trend_range[0],))[:2] if trend_range else (first_day, today)
+time_series_data, trend_bins, trend_resolution = load_trend(
+    pd.Timestamp(trend_start).timestamp(),
+    (pd.Timestamp(trend_end) + pd.Timedelta(days=1)).timestamp() - 1,
+    trend_resolution,
+    store=store,
+)
+with tcol3:
+    st.caption(
+        f"Defects per {trend_resolution.lower()} · {len(time_series_data):,} of {trend_bins:,} points drawn"
+        + (" (min/max downsampled)" if len(time_series_data) < trend_bins else "")
+    )
+
 fig_line = go.Figure()
 
-fig_line.add_trace(go.Scatter(
-    x=time_series_data['Date'],
-    y=time_series_data['Defects'],
-    mode='lines+markers',
-    name='Defects',
-    line=dict(color='#667eea', width=3),
-    marker=dict(size=6),
-    fill='tozeroy',
-    fillcolor='rgba(102, 126, 234, 0.1)'
-))
+# Above a few thousand SVG points the browser spends seconds laying out the
+# chart; WebGL draws the same line in constant time.
+if len(time_series_data) > WEBGL_THRESHOLD:
+    fig_line.add_trace(go.Scattergl(
+        x=time_series_data['Date'],
+        y=time_series_data['Defects'],
+        mode='lines',
+        name='Defects',
+        line=dict(color='#667eea', width=1),
+        fill='tozeroy',
+        fillcolor='rgba(102, 126, 234, 0.1)'
+    ))
+else:
+    fig_line.add_trace(go.Scatter(
+        x=time_series_data['Date'],
+        y=time_series_data['Defects'],
+        mode='lines+markers',
+        name='Defects',
+        line=dict(color='#667eea', width=3),
+        marker=dict(size=6),
+        fill='tozeroy',
+        fillcolor='rgba(102, 126, 234, 0.1)'
+    ))
 
 fig_line.update_layout(
     xaxis_title="Date",
@@ -249,49 +290,86 @@ with col2:
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     st.markdown("#### ⚡ Detection Performance")
 
-    performance_data = pd.DataFrame({
-        'Metric': ['Precision', 'Recall', 'F1-Score', 'Accuracy'],
-        'Score': [0.94, 0.91, 0.92, 0.95]
-    })
-
-    fig_performance = go.Figure(data=[
-        go.Bar(
-            x=performance_data['Metric'],
-            y=performance_data['Score'],
-            marker=dict(
-                color=['#3498db', '#9b59b6', '#1abc9c', '#e74c3c'],
-            ),
-            text=[f"{x:.1%}" for x in performance_data['Score']],
-            textposition='outside',
+    evaluation = load_report()
+    if evaluation is None or not evaluation["results"]:
+        st.info("No evaluation yet: run `python -m engine.evaluate <labelled folder>` to measure precision and "
+                "recall of the FP32 and INT8 models")
+    else:
+        fig_performance = go.Figure(data=[
+            go.Bar(
+                name=result['precision_mode'].upper(),
+                x=['Precision', 'Recall', 'F1-Score'],
+                y=[result['precision'], result['recall'], result['f1']],
+                marker=dict(color=color),
+                text=[f"{x:.1%}" for x in (result['precision'], result['recall'], result['f1'])],
+                textposition='outside',
+            )
+            for result, color in zip(evaluation["results"], ['#3498db', '#9b59b6'])
+        ])
+
+        fig_performance.update_layout(
+            yaxis_title="Score",
+            yaxis=dict(range=[0, 1.1]),
+            height=300,
+            margin=dict(l=20, r=20, t=20, b=20),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            legend=dict(orientation="h", y=1.1),
         )
-    ])
 
-    fig_performance.update_layout(
-        yaxis_title="Score",
-        yaxis=dict(range=[0, 1]),
-        height=300,
-        margin=dict(l=20, r=20, t=20, b=20),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-    )
-
-    st.plotly_chart(fig_performance, use_container_width=True)
+        st.plotly_chart(fig_performance, use_container_width=True)
+        st.caption(
+            f"{evaluation['images']:,} labelled images ({evaluation['labels']:,} defects) · "
+            f"{pd.Timestamp.fromtimestamp(evaluation['created']):%Y-%m-%d} · " + " · ".join(
+                f"{result['precision_mode'].upper()} {result['latency_ms']['mean']:.0f} ms/image "
+                f"({result['images_per_s']:.1f}/s)"
+                for result in evaluation["results"]
+            )
+        )
     st.markdown('</div>', unsafe_allow_html=True)
 
 st.markdown("---")
 
-st.markdown("### 📋 Recent Detection History")
+st.markdown("### 📋 Detection History")
+
+fcol1, fcol2, fcol3 = st.columns(3)
+with fcol1:
+    date_range = st.date_input("Date range", value=(first_day, today), max_value=today)
+    panel_filter = st.text_input("Panel ID", placeholder="Exact panel ID")
+with fcol2:
+    type_filter = st.multiselect("Defect types", CLASS_NAMES, default=CLASS_NAMES)
+    severity_filter = st.multiselect("Severity", SEVERITIES, default=SEVERITIES)
+with fcol3:
+    min_confidence = st.slider("Minimum confidence", 0.0, 1.0, 0.0, 0.05)
+    page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+
+start_day, end_day = (date_range + (date_range[0],))[:2] if date_range else (first_day, today)
+history_filter = HistoryFilter(
+    start=pd.Timestamp(start_day).timestamp(),
+    end=(pd.Timestamp(end_day) + pd.Timedelta(days=1)).timestamp(),
+    panel_id=panel_filter.strip() or None,
+    defect_types=tuple(CLASS_NAMES.index(name) for name in type_filter) or (-1,),
+    severities=tuple(SEVERITIES.index(name) for name in severity_filter) or (-1,),
+    min_confidence=min_confidence,
+)
+
+# Pages are addressed by the keyset of a row already shown, never by offset, so
+# deep pages cost the same as the first. Any filter change starts over.
+pager = st.session_state.get("history_pager")
+if pager is None or pager["filter"] != (history_filter, page_size):
+    pager = {"filter": (history_filter, page_size), "page": 0, "after": None, "before": None}
+    st.session_state["history_pager"] = pager
 
-history_data = pd.DataFrame({
-    'Timestamp': pd.date_range(end=pd.Timestamp.now(), periods=10, freq='H')[::-1],
-    'Panel ID': [f'PANEL-{np.random.randint(1000, 9999)}' for _ in range(10)],
-    'Defect Type': np.random.choice(['Cracks', 'Hotspots', 'Broken Grids', 'Bird Droppings'], 10),
-    'Severity': np.random.choice(['High', 'Medium', 'Low'], 10),
-    'Confidence': np.random.uniform(0.70, 0.99, 10)
-})
+rows, more = store.history_page(history_filter, page_size, after=pager["after"], before=pager["before"])
+if pager["before"] is not None and not more:
+    # Walked back to the first page: reload it from the top so rows newer than
+    # the old cursor (written since) are not skipped.
+    pager.update(page=0, before=None)
+    rows, more = store.history_page(history_filter, page_size)
+has_prev = more if pager["before"] is not None else pager["page"] > 0
+has_next = more if pager["before"] is None else True
 
-history_data['Timestamp'] = history_data['Timestamp'].dt.strftime('%Y-%m-%d %H:%M')
-history_data['Confidence'] = history_data['Confidence'].apply(lambda x: f"{x:.1%}")
+history_data = history_frame(rows)
 
 def highlight_severity(row):
     if row['Severity'] == 'High':
@@ -314,20 +392,87 @@ st.dataframe(
     }
 )
 
+pcol1, pcol2, pcol3 = st.columns([1, 2, 1])
+with pcol1:
+    st.button(
+        "◀ Newer", disabled=not has_prev, use_container_width=True, on_click=pager.update,
+        kwargs=dict(page=max(0, pager["page"] - 1), after=None, before=rows and (rows[0]["ts"], rows[0]["id"])),
+    )
+with pcol2:
+    first_row = pager["page"] * page_size + 1
+    st.caption(
+        f"Rows {first_row:,}–{first_row + len(rows) - 1:,}" if rows else "No detections match these filters"
+    )
+with pcol3:
+    st.button(
+        "Older ▶", disabled=not has_next, use_container_width=True, on_click=pager.update,
+        kwargs=dict(page=pager["page"] + 1, after=rows and (rows[-1]["ts"], rows[-1]["id"]), before=None),
+    )
+
 st.markdown("---")
 
 col1, col2, col3 = st.columns(3)
 with col1:
     if st.button("🔄 Refresh Data", use_container_width=True):
         st.rerun()
-with col2:
-    st.download_button(
-        label="📥 Export Report",
-        data=history_data.to_csv(index=False),
-        file_name="defect_report.csv",
-        mime="text/csv",
-        use_container_width=True
+    st.caption(
+        f"Data as of {pd.Timestamp.fromtimestamp(query_cache.loaded_at('totals')):%H:%M:%S} · "
+        f"query cache {query_cache.hits} hits / {query_cache.misses} misses"
     )
+with col2:
+    export_format = st.selectbox("Export format", list(FORMATS), label_visibility="collapsed")
+    export = memory.get("history_export")
+    if export is not None and (export[0] != (history_filter, export_format) or export[1].file.closed):
+        # The prepared file no longer matches the filters on screen, or was evicted to free memory.
+        memory.discard("history_export")
+        export = None
+    exported = st.button("📥 Export Report", use_container_width=True)
+    if exported:
+        progress = st.empty()
+        result = export_history(
+            store, history_filter, export_format, max_bytes=DOWNLOAD_MAX_BYTES,
+            on_progress=lambda rows: progress.caption(f"Exported {rows:,} rows…"),
+        )
+        progress.empty()
+        if result.truncated:
+            result.file.close()
+            memory.discard("history_export")
+            export = None
+            st.warning(
+                f"The export passed {DOWNLOAD_MAX_BYTES / 2**20:.0f} MB after {result.rows:,} rows, more than the "
+                "app can serve as a download. Narrow the date range, panel, defect types or severity above and "
+                "export again."
+            )
+        else:
+            export = memory.put(
+                "history_export", ((history_filter, export_format), result),
+                size=result.memory_bytes, on_release=lambda released: released[1].file.close(),
+            )
+    if export is not None:
+        result = export[1]
+        # st.download_button takes the file as bytes and Streamlit keeps its own copy, so the spooled
+        # file is only read on the run the user asks for it, not on every pagination or filter rerun.
+        if exported or st.button(f"⬇️ Get {result.file_name}", use_container_width=True):
+            result.file.seek(0)
+            st.download_button(
+                label=f"⬇️ Download {result.file_name}",
+                data=result.file.read(),
+                file_name=result.file_name,
+                mime=result.mime,
+                use_container_width=True
+            )
+        st.caption(f"{result.rows:,} rows · {result.size / 1e6:.1f} MB · {result.elapsed_ms / 1000:.1f} s")
 with col3:
     if st.button("📊 Generate Analysis", use_container_width=True):
         st.success("Detailed analysis report generated!")
+
+with st.sidebar:
+    st.markdown("### 🧠 Session Memory")
+    session_usage = memory.usage()
+    memory_stats = memory.manager.stats()
+    st.caption(
+        f"This session: {session_usage['bytes'] / 2**20:.1f} of {session_usage['budget'] / 2**20:.0f} MB · "
+        f"All sessions: {memory_stats['bytes'] / 2**20:.1f} of {memory_stats['budget'] / 2**20:.0f} MB"
+    )
+
+profile.rendered()